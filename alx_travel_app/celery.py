@@ -1,9 +1,76 @@
 import os
 from celery import Celery
+from kombu import Queue
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_travel_app.settings')
+# Celery's Django fixup runs the system checks at worker start, which imports
+# the URLconf, every view and drf-yasg; the web deploy runs them already
+os.environ.setdefault('CELERY_SKIP_CHECKS', 'true')
 
 app = Celery('alx_travel_app')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
-app.conf.broker_connection_retry_on_startup = True
\ No newline at end of file
+app.conf.broker_connection_retry_on_startup = True
+
+# Separate queues so payment work never waits behind bulk mail. Run a worker per queue:
+#   celery -A alx_travel_app worker -Q payments -l info
+#   celery -A alx_travel_app worker -Q mail,default -l info
+app.conf.task_queues = (
+    Queue('payments'),
+    Queue('mail'),
+    Queue('default'),
+)
+app.conf.task_default_queue = 'default'
+app.conf.task_routes = {
+    'alx_travel_app.listings.tasks.reconcile_pending_payments': {'queue': 'payments'},
+    'alx_travel_app.listings.tasks.dispatch_outbox': {'queue': 'payments'},
+    'alx_travel_app.listings.tasks.send_payment_confirmation_email': {'queue': 'mail'},
+    'alx_travel_app.listings.tasks.flush_confirmation_emails': {'queue': 'mail'},
+}
+
+# Per-task rate limits (enforced per worker process); keeps SMTP and Chapa under their quotas
+app.conf.task_annotations = {
+    'alx_travel_app.listings.tasks.send_payment_confirmation_email': {
+        'rate_limit': os.getenv('EMAIL_TASK_RATE_LIMIT', '10/s'),
+    },
+    'alx_travel_app.listings.tasks.flush_confirmation_emails': {
+        'rate_limit': os.getenv('EMAIL_FLUSH_RATE_LIMIT', '30/m'),
+    },
+    'alx_travel_app.listings.tasks.reconcile_pending_payments': {
+        'rate_limit': os.getenv('CHAPA_RECONCILE_RATE_LIMIT', '6/m'),
+    },
+}
+
+# Reserve one message at a time so a long mail backlog is not hoarded by a busy worker
+app.conf.worker_prefetch_multiplier = 1
+
+# Periodic jobs run by `celery -A alx_travel_app beat`
+app.conf.beat_schedule = {
+    'reconcile-pending-payments': {
+        'task': 'alx_travel_app.listings.tasks.reconcile_pending_payments',
+        'schedule': float(os.getenv('CHAPA_RECONCILE_INTERVAL', 300)),  # seconds
+    },
+    # Safety sweep for outbox rows whose on-commit dispatch was lost or failed;
+    # scheduled every OUTBOX_DISPATCH_INTERVAL seconds, see schedule_from_settings
+    'dispatch-outbox': {
+        'task': 'alx_travel_app.listings.tasks.dispatch_outbox',
+    },
+    # Drops stored Idempotency-Key responses past their TTL
+    'purge-idempotency-keys': {
+        'task': 'alx_travel_app.listings.tasks.purge_idempotency_keys',
+        'schedule': 3600.0,
+    },
+    # Sends confirmation emails queued in batch mode (EMAIL_BATCH_ENABLED);
+    # scheduled every EMAIL_BATCH_WINDOW seconds, see schedule_from_settings
+    'flush-confirmation-emails': {
+        'task': 'alx_travel_app.listings.tasks.flush_confirmation_emails',
+    },
+}
+
+
+@app.on_after_configure.connect
+def schedule_from_settings(sender, **kwargs):
+    # Django settings are loaded by now; reading them at import would be circular
+    from django.conf import settings
+    sender.conf.beat_schedule['dispatch-outbox']['schedule'] = settings.OUTBOX_DISPATCH_INTERVAL
+    sender.conf.beat_schedule['flush-confirmation-emails']['schedule'] = settings.EMAIL_BATCH_WINDOW
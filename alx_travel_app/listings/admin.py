@@ -1,8 +1,139 @@
+import json
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import Booking, Listing, Payment, Review
+
+
+# ---------------------------------------------
+# Estimated counts
+# ---------------------------------------------
+def estimate_count(queryset):
+    """
+    PostgreSQL's estimate of the number of rows in queryset, or None when
+    there is none (other backends, or a table never analyzed).
+
+    An unfiltered queryset reads pg_class.reltuples, kept by ANALYZE and
+    autovacuum; a filtered one takes the planner's row estimate from EXPLAIN.
+    Neither touches the table itself.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where and not queryset.query.distinct:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+            # -1 (or 0 on older servers) until the first ANALYZE
+            return row[0] if row and row[0] > 0 else None
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Page-number paginator that trusts PostgreSQL statistics for large
+    results. COUNT(*) on a million-row table reads every row; the estimate
+    costs one catalog lookup. Results estimated below
+    ADMIN_EXACT_COUNT_LIMIT rows are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.ADMIN_EXACT_COUNT_LIMIT:
+            return self.object_list.count()
+        return estimate
+
+
+# ---------------------------------------------
+# Changelists that stay fast on large tables
+# ---------------------------------------------
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for tables with millions of rows.
+
+    - Counts come from EstimatedCountPaginator, and the unfiltered total
+      ("N total") is not counted at all.
+    - Each search field is matched exactly, so every term is an index
+      lookup instead of an icontains scan of the whole table.
+    - Subclasses order by an indexed column and set list_select_related for
+      every relation their list_display (or __str__) reads.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        query = Q()
+        for field_name in self.search_fields:
+            field = get_fields_from_path(self.model, field_name)[-1]
+            try:
+                value = field.to_python(term)
+            except ValidationError:
+                # e.g. a username typed into an id field
+                continue
+            query |= Q(**{field_name: value})
+        if not query:
+            return queryset.none(), False
+        # Forward relations only, so no row can match twice
+        return queryset.filter(query), False
+
+
+@admin.register(Listing)
+class ListingAdmin(LargeTableAdmin):
+    list_display = ("id", "title", "location", "price_per_night", "review_count", "updated_at")
+    search_fields = ("id",)
+    search_help_text = "Exact listing id"
+    ordering = ("-id",)
+
+
+@admin.register(Booking)
+class BookingAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "property", "check_in", "check_out", "created_at")
+    list_select_related = ("user", "property")
+    # booking_created_id_idx serves both the date filter and the ordering
+    list_filter = (("created_at", admin.DateFieldListFilter),)
+    search_fields = ("id", "user__username", "property")
+    search_help_text = "Exact booking id, username or listing id"
+    raw_id_fields = ("user", "property")
+    ordering = ("-created_at", "-id")
+
+
+@admin.register(Payment)
+class PaymentAdmin(LargeTableAdmin):
+    list_display = ("id", "booking_reference", "user", "amount", "payment_status", "transaction_id", "created_at")
+    list_select_related = ("user",)
+    # payment_status_created_idx leads with the status
+    list_filter = ("payment_status",)
+    search_fields = ("id", "transaction_id", "booking")
+    search_help_text = "Exact payment id, transaction id or booking id"
+    raw_id_fields = ("user", "booking")
+    ordering = ("-id",)
 
-# Register your models here.
-from .models import Booking, Listing, Payment
 
-admin.site.register(Booking)
-admin.site.register(Listing)
-admin.site.register(Payment)
\ No newline at end of file
+@admin.register(Review)
+class ReviewAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "property", "rating")
+    list_select_related = ("user", "property")
+    search_fields = ("id", "user__username", "property")
+    search_help_text = "Exact review id, username or listing id"
+    raw_id_fields = ("user", "property")
+    ordering = ("-id",)
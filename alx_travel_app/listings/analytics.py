@@ -0,0 +1,183 @@
+# listings/analytics.py
+"""
+Per-listing, per-month occupancy and revenue rollups (ListingMonthlyStats).
+
+Attribution:
+- booked_nights: each night of a stay counts in the month it falls in, so a
+  stay across a month end is split between both months;
+- booking_count: a booking counts once, in the month of its check-in;
+- revenue: Completed payments of a booking, in the month of its check-in.
+
+Writes apply a StatsDelta (signals.py and the bulk write paths), so the
+rollup moves with the data without re-aggregating bookings.
+rebuild_listing_stats() recomputes it from scratch.
+"""
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+
+from .models import Booking, Listing, ListingMonthlyStats, Payment
+
+STATS_COLUMNS = ("booked_nights", "booking_count", "revenue")
+# Rows per INSERT; keeps the bound parameters well under driver limits
+UPSERT_BATCH_SIZE = 1000
+
+
+# ---------------------------------------------
+# Months
+# ---------------------------------------------
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (month_start(day) + timedelta(days=32)).replace(day=1)
+
+
+def days_in_month(month):
+    return calendar.monthrange(month.year, month.month)[1]
+
+
+def split_nights(check_in, check_out):
+    """
+    Yield (month, nights) for every month a stay occupies. The night of
+    check_out - 1 is the last one booked.
+    """
+    day = check_in
+    while day < check_out:
+        end = min(next_month(day), check_out)
+        yield month_start(day), (end - day).days
+        day = end
+
+
+# ---------------------------------------------
+# Incremental updates
+# ---------------------------------------------
+class StatsDelta:
+    """
+    Changes to ListingMonthlyStats rows, accumulated per (listing, month)
+    and written by apply() in one statement per kind of change.
+    """
+
+    def __init__(self):
+        self.rows = defaultdict(lambda: [0, 0, Decimal("0")])
+
+    def add_stay(self, listing_id, check_in, check_out, sign=1):
+        for month, nights in split_nights(check_in, check_out):
+            self.rows[(listing_id, month)][0] += sign * nights
+        self.rows[(listing_id, month_start(check_in))][1] += sign
+
+    def add_revenue(self, listing_id, check_in, amount):
+        if amount:
+            self.rows[(listing_id, month_start(check_in))][2] += amount
+
+    def add_booking_revenue(self, amounts, sign=1):
+        """
+        Attribute {booking_id: amount} to the bookings' listings and
+        check-in months (one query).
+        """
+        bookings = Booking.objects.filter(id__in=[pk for pk, amount in amounts.items() if amount])
+        for booking_id, listing_id, check_in in bookings.values_list("id", "property_id", "check_in"):
+            self.add_revenue(listing_id, check_in, sign * amounts[booking_id])
+
+    def apply(self):
+        """
+        Write the accumulated changes. Rows that only grow are upserted with
+        INSERT ... ON CONFLICT (one statement per UPSERT_BATCH_SIZE rows),
+        which also creates the first row of a month. Rows losing anything
+        were counted before, so they already exist and are updated in place;
+        they are clamped at zero so a rollup that was never rebuilt cannot
+        fail a write.
+        """
+        growing, shrinking = [], []
+        # Sorted, so concurrent writers lock rows in the same order
+        for key in sorted(self.rows):
+            values = self.rows[key]
+            if not any(values):
+                continue
+            (shrinking if min(values) < 0 else growing).append((*key, *values))
+        self.rows.clear()
+
+        for start in range(0, len(growing), UPSERT_BATCH_SIZE):
+            _upsert(growing[start:start + UPSERT_BATCH_SIZE])
+        for listing_id, month, *values in shrinking:
+            ListingMonthlyStats.objects.filter(property_id=listing_id, month=month).update(**{
+                column: Greatest(F(column) + value, 0)
+                for column, value in zip(STATS_COLUMNS, values) if value
+            })
+
+
+def _upsert(rows):
+    quote = connection.ops.quote_name
+    table = quote(ListingMonthlyStats._meta.db_table)
+    columns = ", ".join(quote(column) for column in ("property_id", "month", *STATS_COLUMNS))
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+    increments = ", ".join(
+        f"{quote(column)} = {table}.{quote(column)} + EXCLUDED.{quote(column)}" for column in STATS_COLUMNS
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) VALUES {placeholders} "
+            f"ON CONFLICT ({quote('property_id')}, {quote('month')}) DO UPDATE SET {increments}",
+            [value for row in rows for value in row],
+        )
+
+
+def completed_revenue(booking_ids):
+    """
+    {booking_id: sum of Completed payments} for bookings that have any
+    """
+    return dict(
+        Payment.objects.filter(booking_id__in=booking_ids, payment_status="Completed")
+        .values("booking_id").annotate(total=Sum("amount")).values_list("booking_id", "total")
+    )
+
+
+# ---------------------------------------------
+# Full rebuild
+# ---------------------------------------------
+def rebuild_listing_stats(listing_ids=None, chunk_size=1000):
+    """
+    Recompute the rollup from bookings and payments, a chunk of listings
+    per transaction, and return the number of rows written.
+
+    Writes that land on a chunk while it is being rebuilt may be lost; run
+    it after migrating, after loading data outside the ORM, or whenever the
+    rollup is suspected to have drifted.
+    """
+    listings = Listing.objects.order_by("id")
+    if listing_ids is not None:
+        listings = listings.filter(id__in=listing_ids)
+
+    written, last_id = 0, 0
+    while True:
+        chunk = list(listings.filter(id__gt=last_id).values_list("id", flat=True)[:chunk_size])
+        if not chunk:
+            return written
+        last_id = chunk[-1]
+
+        delta = StatsDelta()
+        stays = Booking.objects.filter(property_id__in=chunk).values_list("property_id", "check_in", "check_out")
+        for listing_id, check_in, check_out in stays.iterator(chunk_size=5000):
+            delta.add_stay(listing_id, check_in, check_out)
+        # Summed per listing and check-in day by the database
+        revenue = (
+            Payment.objects.filter(payment_status="Completed", booking__property_id__in=chunk)
+            .values_list("booking__property_id", "booking__check_in").annotate(total=Sum("amount"))
+        )
+        for listing_id, check_in, total in revenue:
+            delta.add_revenue(listing_id, check_in, total)
+
+        rows = [
+            ListingMonthlyStats(property_id=listing_id, month=month, **dict(zip(STATS_COLUMNS, values)))
+            for (listing_id, month), values in sorted(delta.rows.items())
+        ]
+        with transaction.atomic():
+            ListingMonthlyStats.objects.filter(property_id__in=chunk).delete()
+            ListingMonthlyStats.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
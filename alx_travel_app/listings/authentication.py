@@ -0,0 +1,138 @@
+# listings/authentication.py
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from redis.exceptions import RedisError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+logger = logging.getLogger(__name__)
+
+# What requests read from request.user; anything else is loaded on first access
+CACHED_USER_FIELDS = ("id", "username", "email", "is_active", "is_staff", "is_superuser")
+
+
+def user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+class UserCache:
+    """
+    Two-level cache of authenticated users, keyed by user id.
+
+    Entries are plain dicts of CACHED_USER_FIELDS (plus a digest for the
+    token revocation check), never the pickled user with its password hash.
+    The first level is a small dict in this process, read without any I/O
+    and kept for AUTH_USER_LOCAL_CACHE_TIMEOUT seconds. The second is the
+    shared Django cache (Redis in production), kept for
+    AUTH_USER_CACHE_TIMEOUT seconds. Saving or deleting a user invalidates
+    both levels in the process that made the change and the shared level
+    everywhere; other processes may serve their local copy until it expires,
+    so keep the local timeout short.
+
+    A Redis outage only costs the optimisation: reads miss (and the user is
+    loaded from the database) and writes are skipped. An invalidation lost
+    that way leaves the shared entry until it expires.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is not None:
+                if entry[0] > now:
+                    return entry[1]
+                del self._local[user_id]
+
+        try:
+            data = cache.get(user_key(user_id))
+        except RedisError as e:
+            logger.warning(f"User cache unavailable, loading user {user_id} from the database: {str(e)}")
+            return None
+        if data is not None:
+            self._remember(user_id, data)
+        return data
+
+    def set(self, user_id, data):
+        self._remember(user_id, data)
+        try:
+            cache.set(user_key(user_id), data, settings.AUTH_USER_CACHE_TIMEOUT)
+        except RedisError as e:
+            logger.warning(f"Could not cache user {user_id}: {str(e)}")
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._local.pop(user_id, None)
+        try:
+            cache.delete(user_key(user_id))
+        except RedisError as e:
+            logger.error(f"Could not invalidate cached user {user_id}; it expires in "
+                         f"{settings.AUTH_USER_CACHE_TIMEOUT}s: {str(e)}")
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _remember(self, user_id, data):
+        timeout = settings.AUTH_USER_LOCAL_CACHE_TIMEOUT
+        if timeout <= 0:
+            return
+        with self._lock:
+            self._local[user_id] = (time.monotonic() + timeout, data)
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from user_cache
+    instead of querying the user table on every request
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        data = user_cache.get(user_id)
+        if data is None:
+            # Not-found, inactive and revoked users raise here and are never cached
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, self._user_data(user))
+            return user
+        self._check_user(data, validated_token)
+        # A fresh instance per request; other fields are deferred and load on access
+        return self.user_model.from_db(
+            DEFAULT_DB_ALIAS, CACHED_USER_FIELDS, [data[name] for name in CACHED_USER_FIELDS]
+        )
+
+    @staticmethod
+    def _user_data(user):
+        data = {name: getattr(user, name) for name in CACHED_USER_FIELDS}
+        # Only the digest the revocation check compares, not the password hash
+        data["password_md5"] = get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+        return data
+
+    @staticmethod
+    def _check_user(data, validated_token):
+        # The checks JWTAuthentication.get_user makes after loading the row
+        if not data["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != data["password_md5"]:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
@@ -0,0 +1,153 @@
+# listings/cache.py
+
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# List pages embed every listing, so a listing change cannot be traced to
+# the pages that contain it. Instead list keys carry a generation number
+# that is bumped on every change, which orphans all old pages at once.
+LIST_GENERATION_KEY = "listings:list:generation"
+STATS_KEYS = {"hits": "listings:cache:hits", "misses": "listings:cache:misses"}
+
+
+def detail_key(pk):
+    return f"listings:detail:{pk}"
+
+
+def list_key(request):
+    """
+    Per-query key: the full URL (host, path and query string) under the
+    current generation, or None when the cache is unavailable
+    """
+    try:
+        generation = _list_generation()
+    except RedisError as e:
+        logger.warning(f"Listing cache unavailable: {str(e)}")
+        return None
+    digest = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+    return f"listings:list:{generation}:{digest}"
+
+
+def _list_generation():
+    generation = cache.get(LIST_GENERATION_KEY)
+    if generation is None:
+        cache.add(LIST_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(LIST_GENERATION_KEY)
+    return generation
+
+
+def _count(name):
+    key = STATS_KEYS[name]
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # First event since the cache was flushed
+            cache.add(key, 0, None)
+            cache.incr(key)
+    except RedisError:
+        # Only the statistics lose an event; the lookup already succeeded
+        pass
+
+
+def get_or_build(key, build):
+    """
+    Return the cached value for key, building and storing it on a miss.
+
+    Only one caller rebuilds a missing key: it takes a short lock with
+    cache.add, and concurrent callers poll for its result for up to
+    LISTING_CACHE_LOCK_WAIT seconds instead of all hitting the database.
+
+    The cache only saves work: when it is unavailable (or key is None) the
+    value is built and returned uncached, and the hit/miss counters are
+    left alone.
+    """
+    if key is None:
+        return build()
+    try:
+        value = cache.get(key)
+    except RedisError as e:
+        logger.warning(f"Listing cache unavailable, serving {key} uncached: {str(e)}")
+        return build()
+    if value is not None:
+        _count("hits")
+        return value
+    _count("misses")
+
+    lock_key = f"{key}:lock"
+    try:
+        locked = cache.add(lock_key, 1, settings.LISTING_CACHE_LOCK_TIMEOUT)
+    except RedisError as e:
+        logger.warning(f"Listing cache unavailable, serving {key} uncached: {str(e)}")
+        return build()
+    if locked:
+        try:
+            value = build()
+            try:
+                cache.set(key, value, settings.LISTING_CACHE_TIMEOUT)
+            except RedisError as e:
+                logger.warning(f"Could not cache {key}: {str(e)}")
+        finally:
+            try:
+                cache.delete(lock_key)
+            except RedisError:
+                # It expires after LISTING_CACHE_LOCK_TIMEOUT
+                pass
+        return value
+
+    deadline = time.monotonic() + settings.LISTING_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            value = cache.get(key)
+        except RedisError:
+            break
+        if value is not None:
+            return value
+    # The rebuilding worker is slow or died, or the cache went away; serve a fresh value uncached
+    return build()
+
+
+def invalidate_listing(pk):
+    """
+    Drop the cached detail for one listing and orphan every cached list page.
+
+    Runs from model signals (usually on commit), so a cache outage is logged
+    rather than raised; stale entries then live until LISTING_CACHE_TIMEOUT.
+    """
+    try:
+        cache.delete(detail_key(pk))
+    except RedisError as e:
+        logger.error(f"Could not invalidate cached listing {pk}: {str(e)}")
+    invalidate_lists()
+
+
+def invalidate_lists():
+    """
+    Orphan every cached list page (for bulk writes that add listings without signals)
+    """
+    try:
+        try:
+            cache.incr(LIST_GENERATION_KEY)
+        except ValueError:
+            cache.set(LIST_GENERATION_KEY, time.time_ns(), None)
+    except RedisError as e:
+        logger.error(f"Could not invalidate cached listing pages: {str(e)}")
+
+
+def stats():
+    hits = cache.get(STATS_KEYS["hits"]) or 0
+    misses = cache.get(STATS_KEYS["misses"]) or 0
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
@@ -0,0 +1,128 @@
+# listings/idempotency.py
+
+import functools
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+# Seconds between checks while a duplicate waits for the first request
+PENDING_POLL_INTERVAL = 0.1
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256()
+    for part in (request.method, request.get_full_path(), request.body):
+        digest.update(part if isinstance(part, bytes) else part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def idempotent(view_method):
+    """
+    Honour an Idempotency-Key header on a view method.
+
+    The first request with a key commits a pending IdempotencyKey row in
+    its own short transaction, then runs the view outside it: no database
+    transaction or row lock is held while the view talks to Chapa. A
+    successful response is then stored on the row; a failed one (or an
+    exception) deletes it so the client may retry with the same key.
+    Duplicates replay the stored response without re-running validation or
+    calling Chapa. A duplicate that arrives while the first request is
+    still pending waits for it, at most as long as a Chapa request may
+    take, and gets 409 only if it is still pending after that.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or getattr(self, "swagger_fake_view", False):
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({"error": f"{HEADER} must be at most 255 characters"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = _fingerprint(request)
+        record, claimed = _claim(request.user, key, fingerprint)
+        if not claimed and record.fingerprint == fingerprint:
+            record = _wait(record)
+            if record is None:
+                # The first request failed and released the key; try it ourselves
+                record, claimed = _claim(request.user, key, fingerprint)
+        if not claimed:
+            return _replay(record, fingerprint)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except BaseException:
+            record.delete()
+            raise
+        if 200 <= response.status_code < 300:
+            record.status_code = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=["status_code", "response_body"])
+        else:
+            # Nothing to replay; forget the key
+            record.delete()
+        return response
+
+    return wrapper
+
+
+def _claim(user, key, fingerprint):
+    """
+    (record, claimed): claimed when this request inserted the key's row, or
+    took over a pending row abandoned for IDEMPOTENCY_PENDING_TIMEOUT seconds
+    """
+    with transaction.atomic():
+        record, created = IdempotencyKey.objects.get_or_create(
+            user=user, key=key, defaults={"fingerprint": fingerprint}
+        )
+    if created or record.status_code is not None:
+        return record, created
+
+    stale_before = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_PENDING_TIMEOUT)
+    if record.created_at >= stale_before:
+        return record, False
+    # The worker that claimed it died mid-request; only one retry wins the takeover
+    taken = IdempotencyKey.objects.filter(
+        pk=record.pk, status_code__isnull=True, created_at=record.created_at
+    ).update(fingerprint=fingerprint, created_at=timezone.now())
+    if taken:
+        record.fingerprint = fingerprint
+    return record, bool(taken)
+
+
+def _wait(record):
+    """
+    Poll a pending record until the request that claimed it finishes, for at
+    most the Chapa connect and read timeouts. Returns the record (still
+    pending if the wait ran out), or None if the request failed and deleted it.
+    """
+    deadline = time.monotonic() + settings.CHAPA_CONNECT_TIMEOUT + settings.CHAPA_READ_TIMEOUT
+    while record.status_code is None and time.monotonic() < deadline:
+        time.sleep(PENDING_POLL_INTERVAL)
+        try:
+            record.refresh_from_db(fields=["status_code", "response_body"])
+        except IdempotencyKey.DoesNotExist:
+            return None
+    return record
+
+
+def _replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response({"error": f"{HEADER} was already used for a different request"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if record.status_code is None:
+        return Response({"error": "A request with this key is still in progress"},
+                        status=status.HTTP_409_CONFLICT)
+    response = Response(record.response_body, status=record.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
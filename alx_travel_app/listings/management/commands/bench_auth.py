@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from alx_travel_app.listings.authentication import CachedJWTAuthentication, user_cache
+from alx_travel_app.listings.utils.bench import summarize
+
+
+User = get_user_model()
+
+BENCH_USERNAME = "bench_auth_user"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request cost of resolving the JWT user with and without the user cache: first "
+        "authenticate() alone for both backends, then a full GET request with the cache cold (dropped "
+        "before every request) and warm. Reports SQL queries per request and latency percentiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Timed calls per case")
+        parser.add_argument("--path", default="/api/bookings/?page_size=1", help="Endpoint for the full-request cases")
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={"email": "bench-auth@example.com"})
+        token = str(RefreshToken.for_user(user).access_token)
+        header = f"Bearer {token}"
+        factory = RequestFactory()
+        client = Client(HTTP_AUTHORIZATION=header)
+
+        def authenticate(backend):
+            return lambda: backend.authenticate(Request(factory.get("/", HTTP_AUTHORIZATION=header)))
+
+        def get(cold):
+            def call():
+                if cold:
+                    user_cache.invalidate(user.pk)
+                return client.get(options["path"])
+            return call
+
+        cases = [
+            ("authenticate: JWTAuthentication", authenticate(JWTAuthentication())),
+            ("authenticate: CachedJWTAuthentication", authenticate(CachedJWTAuthentication())),
+            (f"GET {options['path']} (cache cold)", get(cold=True)),
+            (f"GET {options['path']} (cache warm)", get(cold=False)),
+        ]
+        try:
+            self.stdout.write(f"{'case':<52}{'queries':>9}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}")
+            for label, call in cases:
+                user_cache.invalidate(user.pk)
+                call()  # warm-up; fills the cache for the warm cases
+                samples = []
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(options["requests"]):
+                        started = time.perf_counter()
+                        call()
+                        samples.append((time.perf_counter() - started) * 1000)
+                stats = summarize(samples)
+                self.stdout.write(
+                    f"{label:<52}{len(queries.captured_queries) / options['requests']:>9.2f}"
+                    f"{stats['mean_ms']:>9.3f}{stats['p50_ms']:>9.3f}{stats['p95_ms']:>9.3f}"
+                )
+        finally:
+            user.delete()
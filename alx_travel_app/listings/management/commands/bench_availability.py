@@ -0,0 +1,91 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from alx_travel_app.listings.models import Listing, Booking
+from alx_travel_app.listings.utils.bench import summarize, time_call
+
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    """Raised to discard the benchmark rows once the run is finished."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the listing availability search while the bookings table grows. "
+        "Rows are created inside a transaction and rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000",
+                            help="Comma-separated booking table sizes to measure at")
+        parser.add_argument("--listings", type=int, default=2000, help="Number of listings to spread bookings over")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per size")
+        parser.add_argument("--batch-size", type=int, default=10000, help="bulk_create batch size")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--keep", action="store_true", help="Commit the generated rows instead of rolling back")
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options["sizes"].split(","))
+        try:
+            with transaction.atomic():
+                self._run(sizes, options)
+                if not options["keep"]:
+                    raise _Rollback
+        except _Rollback:
+            self.stdout.write("Benchmark rows rolled back.")
+
+    def _run(self, sizes, options):
+        rng = random.Random(options["seed"])
+        user, _ = User.objects.get_or_create(username="bench_user", defaults={"email": "bench@example.com"})
+        listings = Listing.objects.bulk_create(
+            [
+                Listing(
+                    title=f"Bench Property {i}",
+                    description="Benchmark listing",
+                    location=f"City {i % 50}",
+                    price_per_night=rng.randint(50, 300),
+                )
+                for i in range(options["listings"])
+            ],
+            batch_size=options["batch_size"],
+        )
+
+        # Bookings are laid out back to back per listing so they never overlap
+        start = date.today()
+        cursors = {listing.id: start for listing in listings}
+        window = (start + timedelta(days=10), start + timedelta(days=17))
+
+        created = Booking.objects.count()
+        for size in sizes:
+            while created < size:
+                batch = []
+                for _ in range(min(options["batch_size"], size - created)):
+                    listing = listings[rng.randrange(len(listings))]
+                    check_in = cursors[listing.id] + timedelta(days=rng.randint(0, 3))
+                    check_out = check_in + timedelta(days=rng.randint(1, 7))
+                    cursors[listing.id] = check_out
+                    batch.append(Booking(user=user, property=listing, check_in=check_in, check_out=check_out))
+                Booking.objects.bulk_create(batch, batch_size=options["batch_size"])
+                created += len(batch)
+
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {Booking._meta.db_table}")
+
+            queryset = Listing.objects.available_between(*window).values_list("id", flat=True)
+            available = len(list(queryset))
+            stats = summarize(time_call(lambda: list(queryset.all()), repeat=options["repeat"]))
+            self.stdout.write(
+                f"bookings={created:>10}  available={available:>6}  "
+                f"p50={stats['p50_ms']:.2f}ms  p95={stats['p95_ms']:.2f}ms  p99={stats['p99_ms']:.2f}ms"
+            )
+
+        self.stdout.write("\nQuery plan at the largest size:")
+        self.stdout.write(queryset.explain())
@@ -0,0 +1,49 @@
+import requests
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from alx_travel_app.listings.utils.bench import summarize, time_call
+from alx_travel_app.listings.utils.chapa import ChapaClient
+from alx_travel_app.listings.utils.chapa_stub import ChapaStubServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-call latency of one-off requests.post calls with the pooled "
+        "keep-alive ChapaClient, against a local Chapa stub server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=500, help="Timed calls per client")
+        parser.add_argument("--latency", type=float, default=0.0,
+                            help="Artificial server-side delay per call, in seconds")
+
+    def handle(self, *args, **options):
+        payload = {"amount": "10", "currency": "ETB", "email": "bench@example.com", "tx_ref": "bench"}
+
+        with ChapaStubServer(latency=options["latency"]) as stub:
+            url = f"{stub.base_url}/transaction/initialize"
+
+            def unpooled():
+                # What the views used to do: a fresh connection per call
+                requests.post(url, json=payload, timeout=10).json()
+
+            with override_settings(CHAPA_BASE_URL=stub.base_url):
+                client = ChapaClient()
+                results = {
+                    "requests.post (new connection)": summarize(time_call(unpooled, repeat=options["calls"])),
+                    "ChapaClient (keep-alive pool)": summarize(
+                        time_call(lambda: client.initialize(payload).json(), repeat=options["calls"])
+                    ),
+                }
+                client.close()
+
+        for label, stats in results.items():
+            self.stdout.write(
+                f"{label:<32} mean={stats['mean_ms']:.3f}ms  p50={stats['p50_ms']:.3f}ms  "
+                f"p95={stats['p95_ms']:.3f}ms  p99={stats['p99_ms']:.3f}ms"
+            )
+        self.stdout.write(
+            "Note: the stub speaks plain HTTP, so the saving shown excludes the TLS handshake "
+            "that production calls to Chapa also avoid."
+        )
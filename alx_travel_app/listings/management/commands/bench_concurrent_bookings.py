@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from alx_travel_app.listings.models import Listing, Booking
+from alx_travel_app.listings.utils.bench import summarize
+
+
+User = get_user_model()
+
+BENCH_TITLE = "Concurrency bench listing"
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent POST /api/bookings/ requests from many threads. 'distinct' gives every client its own "
+        "listing (throughput should grow with clients, since nothing is locked); 'contended' makes every client "
+        "race for the same nights (exactly one may win each, the rest get 409). Rows are committed, so run it "
+        "against PostgreSQL; the bench user and listings are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+        parser.add_argument("--requests", type=int, default=50, help="Bookings attempted per client")
+        parser.add_argument("--mode", choices=["distinct", "contended", "both"], default="both")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write(self.style.WARNING(
+                "Not running on PostgreSQL: there is no overlap constraint and writes are serialized."
+            ))
+        levels = sorted(int(level) for level in options["clients"].split(","))
+        modes = ["distinct", "contended"] if options["mode"] == "both" else [options["mode"]]
+
+        user, _ = User.objects.get_or_create(username="bench_booking_user", defaults={"email": "bench@example.com"})
+        listings = Listing.objects.bulk_create([
+            Listing(title=f"{BENCH_TITLE} {i}", description="", location="Bench", price_per_night=100)
+            for i in range(max(levels))
+        ])
+        token = str(RefreshToken.for_user(user).access_token)
+
+        try:
+            self.stdout.write(
+                f"{'mode':<10}{'clients':>8}{'booked/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses"
+            )
+            start = date.today() + timedelta(days=365 * 60)
+            for mode in modes:
+                for clients in levels:
+                    stats = self._run(mode, clients, options["requests"], listings, user.pk, token, start)
+                    start += timedelta(days=2 * options["requests"] + 7)
+                    self.stdout.write(
+                        f"{mode:<10}{clients:>8}{stats['booked_per_s']:>10.1f}{stats['p50_ms']:>9.2f}"
+                        f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}  {dict(stats['statuses'])}"
+                    )
+
+            clashing = Booking.objects.filter(
+                property=OuterRef("property"), check_in__lt=OuterRef("check_out"), check_out__gt=OuterRef("check_in")
+            ).exclude(pk=OuterRef("pk"))
+            overlaps = Booking.objects.filter(property__in=listings).filter(Exists(clashing)).count()
+            style = self.style.SUCCESS if overlaps == 0 else self.style.ERROR
+            self.stdout.write(style(f"Overlapping bookings stored: {overlaps}"))
+        finally:
+            Listing.objects.filter(pk__in=[listing.pk for listing in listings]).delete()
+            user.delete()
+
+    def _run(self, mode, clients, requests, listings, user_id, token, start):
+        barrier = threading.Barrier(clients)
+
+        def worker(index):
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+            listing = listings[index] if mode == "distinct" else listings[0]
+            samples, statuses = [], Counter()
+            barrier.wait()
+            try:
+                for n in range(requests):
+                    check_in = start + timedelta(days=2 * n)
+                    body = {
+                        "user": user_id,
+                        "property": listing.pk,
+                        "check_in": str(check_in),
+                        "check_out": str(check_in + timedelta(days=1)),
+                    }
+                    started = time.perf_counter()
+                    response = client.post("/api/bookings/", body, content_type="application/json")
+                    samples.append((time.perf_counter() - started) * 1000)
+                    statuses[response.status_code] += 1
+            finally:
+                # Each thread has its own connection; do not leak it
+                connection.close()
+            return samples, statuses
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            results = list(pool.map(worker, range(clients)))
+        elapsed = time.perf_counter() - started
+
+        samples = [sample for result in results for sample in result[0]]
+        statuses = sum((result[1] for result in results), Counter())
+        return {**summarize(samples), "booked_per_s": statuses[201] / elapsed, "statuses": statuses}
+
@@ -0,0 +1,229 @@
+import json
+import subprocess
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from alx_travel_app.listings.models import Listing, Booking, Review, Payment
+from alx_travel_app.listings.utils.bench import summarize
+from alx_travel_app.listings.utils.chapa_stub import ChapaStubServer
+
+
+User = get_user_model()
+
+BENCH_USERNAME = "bench_api_user"
+BENCH_PASSWORD = "bench-api-password"
+
+
+class _Rollback(Exception):
+    """Raised to discard the benchmark fixtures once the run is finished."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API endpoints in-process with the Django test client against the current database "
+        "(seed it first with generate_data). Chapa is replaced by a local stub and every row the run "
+        "writes is rolled back. Reports latency percentiles, throughput and SQL query counts per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Timed requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=10, help="Untimed requests per endpoint")
+        parser.add_argument("--page-size", type=int, default=50, help="page_size for list endpoints")
+        parser.add_argument("--endpoints", default="",
+                            help="Comma-separated endpoint names to run (default: all)")
+        parser.add_argument("--output", help="Write results as JSON to this file")
+        parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+        parser.add_argument("--threshold", type=float, default=20.0,
+                            help="p95 slowdown (percent) reported as a regression")
+        parser.add_argument("--fail-on-regression", action="store_true",
+                            help="Exit with an error when --compare finds a regression")
+
+    def handle(self, *args, **options):
+        listing_ids = list(Listing.objects.order_by("id").values_list("id", flat=True)[:100])
+        if not listing_ids:
+            raise CommandError("No listings found; seed the database first (manage.py generate_data).")
+
+        try:
+            with transaction.atomic():
+                results = self._run(listing_ids, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self._print(results)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options["compare"]:
+            with open(options["compare"]) as handle:
+                regressions = self._compare(json.load(handle), results, options["threshold"])
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"Regressions in: {', '.join(regressions)}")
+
+    # ---------------------------------------------
+    # Fixtures and endpoint table
+    # ---------------------------------------------
+    def _fixtures(self, listing_ids, count):
+        user = User.objects.filter(username=BENCH_USERNAME).first() or User(
+            username=BENCH_USERNAME, email="bench-api@example.com"
+        )
+        user.set_password(BENCH_PASSWORD)
+        user.save()
+
+        # One fresh booking per pay request, far enough ahead to never clash with seeded stays
+        start = date.today() + timedelta(days=365 * 50)
+        pay_bookings = Booking.objects.bulk_create([
+            Booking(
+                user=user, property_id=listing_ids[0],
+                check_in=start + timedelta(days=2 * i), check_out=start + timedelta(days=2 * i + 1),
+            )
+            for i in range(count)
+        ])
+        paid = Booking.objects.create(
+            user=user, property_id=listing_ids[0], check_in=start - timedelta(days=3), check_out=start
+        )
+        Payment.objects.create(
+            user=user, booking=paid, booking_reference=f"booking_{paid.id}", amount=100,
+            transaction_id=f"booking_{paid.id}_bench", payment_status="Completed",
+        )
+        booking_ids = list(Booking.objects.order_by("id").values_list("id", flat=True)[:100])
+        return user, [b.id for b in pay_bookings], paid.id, booking_ids
+
+    def _endpoints(self, listing_ids, pay_ids, paid_id, booking_ids, page_size):
+        """
+        (name, method, path for the i-th request, body, expected status, authenticated)
+        """
+        window = date.today() + timedelta(days=30), date.today() + timedelta(days=37)
+        return [
+            ("token", "post", lambda i: "/api/token/",
+             {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}, 200, False),
+            ("listings:list", "get", lambda i: f"/api/listings/?page_size={page_size}", None, 200, True),
+            ("listings:search", "get",
+             lambda i: f"/api/listings/?check_in={window[0]}&check_out={window[1]}&page_size={page_size}",
+             None, 200, True),
+            ("listings:detail", "get", lambda i: f"/api/listings/{listing_ids[i % len(listing_ids)]}/",
+             None, 200, True),
+            ("bookings:list", "get", lambda i: f"/api/bookings/?page_size={page_size}", None, 200, True),
+            ("bookings:detail", "get", lambda i: f"/api/bookings/{booking_ids[i % len(booking_ids)]}/",
+             None, 200, True),
+            ("bookings:pay", "post", lambda i: f"/api/bookings/{pay_ids[i]}/pay/", None, 201, True),
+            ("payments:verify", "get", lambda i: f"/api/payments/verify/{paid_id}/", None, 200, True),
+            ("payments:verified", "get", lambda i: f"/api/payments/verified/?page_size={page_size}",
+             None, 200, True),
+        ]
+
+    # ---------------------------------------------
+    # Measurement
+    # ---------------------------------------------
+    def _run(self, listing_ids, options):
+        warmup, repeat = options["warmup"], options["requests"]
+        selected = {name for name in options["endpoints"].split(",") if name}
+        _, pay_ids, paid_id, booking_ids = self._fixtures(listing_ids, warmup + repeat)
+        endpoints = self._endpoints(listing_ids, pay_ids, paid_id, booking_ids, options["page_size"])
+        unknown = selected - {endpoint[0] for endpoint in endpoints}
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        results = {"meta": self._meta(options), "endpoints": {}}
+        # Chapa calls go to the local stub; confirmations only reach the (rolled back) outbox
+        with ChapaStubServer() as stub, override_settings(CHAPA_BASE_URL=stub.base_url):
+            client = Client()
+            token = client.post(
+                "/api/token/", {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}
+            ).json()["access"]
+
+            for name, method, path, body, expected, authenticated in endpoints:
+                if selected and name not in selected:
+                    continue
+                headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if authenticated else {}
+
+                def send(i):
+                    if method == "get":
+                        return client.get(path(i), **headers)
+                    return client.post(path(i), body, content_type="application/json", **headers)
+
+                for i in range(warmup):
+                    send(i)
+
+                samples, queries, errors = [], [], 0
+                started = time.perf_counter()
+                for i in range(warmup, warmup + repeat):
+                    with CaptureQueriesContext(connection) as captured:
+                        request_started = time.perf_counter()
+                        response = send(i)
+                        samples.append((time.perf_counter() - request_started) * 1000)
+                    queries.append(len(captured))
+                    errors += response.status_code != expected
+                elapsed = time.perf_counter() - started
+
+                results["endpoints"][name] = {
+                    **summarize(samples),
+                    "throughput_rps": round(repeat / elapsed, 1),
+                    "queries_mean": round(sum(queries) / len(queries), 2),
+                    "queries_max": max(queries),
+                    "errors": errors,
+                }
+        return results
+
+    def _meta(self, options):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "commit": commit,
+            "timestamp": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "requests": options["requests"],
+            "page_size": options["page_size"],
+            "rows": {
+                model._meta.model_name: model.objects.count() for model in (Listing, Booking, Review, Payment)
+            },
+        }
+
+    # ---------------------------------------------
+    # Reporting
+    # ---------------------------------------------
+    def _print(self, results):
+        meta = results["meta"]
+        self.stdout.write(f"commit={meta['commit']}  database={meta['database']}  rows={meta['rows']}\n")
+        self.stdout.write(
+            f"{'endpoint':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'queries':>10}{'errors':>8}"
+        )
+        for name, stats in results["endpoints"].items():
+            self.stdout.write(
+                f"{name:<20}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                f"{stats['throughput_rps']:>10.1f}{stats['queries_max']:>10}{stats['errors']:>8}"
+            )
+
+    def _compare(self, baseline, current, threshold):
+        """
+        Print p50/p95 and query count changes; return the names of regressed endpoints.
+        """
+        self.stdout.write(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'}:")
+        regressions = []
+        for name, stats in current["endpoints"].items():
+            before = baseline["endpoints"].get(name)
+            if before is None:
+                continue
+            p50_change = (stats["p50_ms"] / before["p50_ms"] - 1) * 100 if before["p50_ms"] else 0.0
+            p95_change = (stats["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+            regressed = p95_change > threshold or stats["queries_max"] > before["queries_max"]
+            if regressed:
+                regressions.append(name)
+            line = (
+                f"{name:<20} p50 {p50_change:+7.1f}%  p95 {p95_change:+7.1f}%  "
+                f"queries {before['queries_max']} -> {stats['queries_max']}"
+            )
+            self.stdout.write(self.style.ERROR(line + "  REGRESSION") if regressed else line)
+        return regressions
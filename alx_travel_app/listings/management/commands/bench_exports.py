@@ -0,0 +1,58 @@
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from alx_travel_app.listings.models import Payment
+from alx_travel_app.listings.serializers import PaymentSerializer
+
+
+User = get_user_model()
+
+BENCH_USERNAME = "bench_export_user"
+
+
+class Command(BaseCommand):
+    help = (
+        "Export every completed payment twice and report time and peak Python memory (tracemalloc): once "
+        "through the streaming /api/exports/payments/ endpoint, once the way VerifiedPaymentsView used to "
+        "build it, as one PaymentSerializer(many=True) list. Seed the database first with generate_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", choices=["csv", "ndjson"], default="csv")
+
+    def handle(self, *args, **options):
+        payments = Payment.objects.filter(payment_status="Completed").order_by("created_at", "id")
+        rows = payments.count()
+        if not rows:
+            raise CommandError("No completed payments found; seed the database first (manage.py generate_data).")
+
+        admin, _ = User.objects.get_or_create(
+            username=BENCH_USERNAME, defaults={"email": "bench-export@example.com", "is_staff": True}
+        )
+        client = Client()
+        client.force_login(admin)
+
+        def stream():
+            response = client.get(f"/api/exports/payments/?output={options['output']}")
+            return sum(len(chunk) for chunk in response.streaming_content)
+
+        def serialize():
+            return len(PaymentSerializer(payments.select_related("user"), many=True).data)
+
+        try:
+            self.stdout.write(f"{rows} completed payments")
+            self.stdout.write(f"{'method':<24}{'seconds':>10}{'rows/s':>12}{'peak MiB':>10}")
+            for label, call in ((f"stream {options['output']}", stream), ("serializer list", serialize)):
+                tracemalloc.start()
+                started = time.perf_counter()
+                call()
+                elapsed = time.perf_counter() - started
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stdout.write(f"{label:<24}{elapsed:>10.2f}{rows / elapsed:>12.0f}{peak / 2 ** 20:>10.1f}")
+        finally:
+            admin.delete()
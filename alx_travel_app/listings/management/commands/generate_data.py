@@ -0,0 +1,262 @@
+import csv
+import io
+import random
+import time
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from alx_travel_app.listings import cache as listing_cache
+from alx_travel_app.listings.analytics import StatsDelta
+from alx_travel_app.listings.models import Listing, Booking, Review, Payment, ListingMonthlyStats
+
+
+User = get_user_model()
+
+CITIES = [
+    "Addis Ababa", "Nairobi", "Kigali", "Lagos", "Accra", "Cape Town", "Zanzibar", "Marrakesh",
+    "Cairo", "Dakar", "Kampala", "Lusaka", "Windhoek", "Mombasa", "Bahir Dar", "Arusha",
+]
+KINDS = ["Apartment", "Loft", "Villa", "Cottage", "Studio", "Guesthouse", "Cabin", "Townhouse"]
+ADJECTIVES = ["Sunny", "Quiet", "Modern", "Cosy", "Spacious", "Charming", "Rustic", "Central"]
+COMMENTS = ["Great place!", "Lovely host.", "Would stay again.", "As described.", "A bit noisy.", ""]
+
+# Short stays dominate, with a bump at one week and a thin tail beyond
+STAY_NIGHTS = list(range(1, 15))
+STAY_WEIGHTS = [10, 22, 20, 14, 10, 6, 9, 2, 1, 1, 1, 1, 1, 2]
+MEAN_STAY = sum(n * w for n, w in zip(STAY_NIGHTS, STAY_WEIGHTS)) / sum(STAY_WEIGHTS)
+RATINGS = [5, 4, 3, 2, 1]
+RATING_WEIGHTS = [45, 30, 13, 7, 5]
+
+LISTING_FIELDS = ("title", "description", "location", "price_per_night", "review_count", "rating_sum", "updated_at")
+BOOKING_FIELDS = ("user_id", "property_id", "check_in", "check_out", "created_at", "updated_at")
+REVIEW_FIELDS = ("user_id", "property_id", "rating", "comment")
+PAYMENT_FIELDS = (
+    "user_id", "booking_id", "booking_reference", "amount", "transaction_id", "payment_status", "created_at",
+)
+STATS_FIELDS = ("property_id", "month", "booked_nights", "booking_count", "revenue")
+
+
+# ---------------------------------------------
+# Row writers
+# ---------------------------------------------
+class BulkCreateWriter:
+    """
+    Inserts through bulk_create; the backend must return primary keys
+    so bookings and payments can reference the rows just written.
+    """
+    name = "bulk_create"
+
+    def __init__(self, batch_size):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError("This database cannot return ids from bulk inserts.")
+        self.batch_size = batch_size
+
+    def insert(self, model, fields, rows):
+        objects = model.objects.bulk_create(
+            [model(**dict(zip(fields, row))) for row in rows], batch_size=self.batch_size
+        )
+        return [obj.pk for obj in objects]
+
+
+class CopyWriter:
+    """
+    Streams rows with PostgreSQL COPY. Ids are reserved from the table's
+    sequence up front so child rows can reference them without a read back.
+    """
+    name = "copy"
+
+    def insert(self, model, fields, rows):
+        if not rows:
+            return []
+        table = model._meta.db_table
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(column) for column in ["id", *(model._meta.get_field(f).column for f in fields)])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [table, len(rows)],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for pk, row in zip(ids, rows):
+                writer.writerow((pk, *row))
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {quote(table)} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        return ids
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate large, deterministic volumes of listings, bookings, reviews and payments for load testing. "
+        "Bookings never overlap per listing; the same --seed and --start-date always produce the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=10000, help="Number of listings to create")
+        parser.add_argument("--bookings-per-listing", type=float, default=10,
+                            help="Mean bookings per listing (exponentially distributed, so some listings are busy)")
+        parser.add_argument("--users", type=int, default=1000, help="Size of the guest pool")
+        parser.add_argument("--review-ratio", type=float, default=0.4, help="Share of past stays that get a review")
+        parser.add_argument("--payment-ratio", type=float, default=0.9, help="Share of bookings that get a payment")
+        parser.add_argument("--history-days", type=int, default=365, help="Days of past bookings")
+        parser.add_argument("--future-days", type=int, default=180, help="Days of upcoming bookings")
+        parser.add_argument("--start-date", type=date.fromisoformat, default=None,
+                            help="Date separating past and upcoming stays (default: today)")
+        parser.add_argument("--chunk-size", type=int, default=1000,
+                            help="Listings generated and committed per transaction")
+        parser.add_argument("--batch-size", type=int, default=5000, help="bulk_create batch size")
+        parser.add_argument("--method", choices=["auto", "bulk", "copy"], default="auto",
+                            help="Write path: COPY on PostgreSQL, bulk_create elsewhere (default: auto)")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        method = options["method"]
+        if method == "auto":
+            method = "copy" if connection.vendor == "postgresql" else "bulk"
+        if method == "copy" and connection.vendor != "postgresql":
+            raise CommandError("--method copy requires PostgreSQL.")
+        writer = CopyWriter() if method == "copy" else BulkCreateWriter(options["batch_size"])
+
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now()
+        self.start = options["start_date"] or date.today()
+        self.user_ids = self._ensure_users(options["users"], options["seed"])
+
+        totals, self.write_seconds = Counter(), Counter()
+        started = time.perf_counter()
+        for offset in range(0, options["listings"], options["chunk_size"]):
+            size = min(options["chunk_size"], options["listings"] - offset)
+            with transaction.atomic():
+                totals.update(self._write_chunk(writer, offset, size))
+            elapsed = time.perf_counter() - started
+            rows = sum(totals.values())
+            self.stdout.write(
+                f"listings={offset + size:>10}  rows={rows:>12}  {rows / elapsed:>10,.0f} rows/s"
+            )
+
+        elapsed = time.perf_counter() - started
+        # Bulk writes skip the Listing signals, so stale list pages must be dropped here
+        listing_cache.invalidate_lists()
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                for model in (Listing, Booking, Review, Payment, ListingMonthlyStats):
+                    cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+        self.stdout.write(f"\nWrote with {writer.name} in {elapsed:.1f}s (insert time per table):")
+        for table, count in totals.items():
+            seconds = self.write_seconds[table]
+            rate = f"{count / seconds:>10,.0f} rows/s" if seconds else ""
+            self.stdout.write(f"  {table:<10} {count:>12}  {seconds:>8.1f}s  {rate}")
+        total = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(f"Generated {total} rows ({total / elapsed:,.0f} rows/s)."))
+
+    def _ensure_users(self, count, seed):
+        usernames = [f"load_{seed}_{i}" for i in range(count)]
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(username=name, email=f"{name}@example.com", password=password) for name in usernames],
+            batch_size=self.options["batch_size"],
+            ignore_conflicts=True,
+        )
+        ids = dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+        return [ids[name] for name in usernames]
+
+    def _plan_listing(self, number):
+        """
+        Draw one listing and its stays. Every random choice happens here,
+        before any id is known, so the output depends only on the seed.
+        """
+        rng, options = self.rng, self.options
+        price = Decimal(f"{min(max(rng.lognormvariate(4.6, 0.5), 20), 2000):.2f}")
+        city = rng.choice(CITIES)
+
+        # Stays are laid back to back with random gaps, spread over the whole window
+        window = options["history_days"] + options["future_days"]
+        mean = options["bookings_per_listing"]
+        count = min(int(rng.expovariate(1 / mean)), window // 2) if mean > 0 else 0
+        mean_gap = max(window - count * MEAN_STAY, 0) / (count + 1)
+        cursor = self.start - timedelta(days=options["history_days"])
+
+        stays = []
+        for _ in range(count):
+            if mean_gap > 0:
+                cursor += timedelta(days=int(rng.expovariate(1 / mean_gap)))
+            nights = rng.choices(STAY_NIGHTS, STAY_WEIGHTS)[0]
+            check_in, check_out = cursor, cursor + timedelta(days=nights)
+            cursor = check_out
+            past = check_out <= self.start
+
+            status = None
+            if rng.random() < options["payment_ratio"]:
+                if past:
+                    status = "Completed" if rng.random() < 0.92 else "Failed"
+                else:
+                    status = rng.choices(["Completed", "Pending", "Failed"], [65, 30, 5])[0]
+            review = None
+            if past and rng.random() < options["review_ratio"]:
+                review = (rng.choices(RATINGS, RATING_WEIGHTS)[0], rng.choice(COMMENTS))
+            stays.append((rng.choice(self.user_ids), check_in, check_out, price * nights, status, review))
+
+        ratings = [stay[5][0] for stay in stays if stay[5]]
+        listing = (
+            f"{rng.choice(ADJECTIVES)} {rng.choice(KINDS)} in {city} #{number}",
+            f"Generated listing {number} in {city}",
+            city,
+            price,
+            len(ratings),
+            sum(ratings),
+            self.now,
+        )
+        return listing, stays
+
+    def _insert(self, writer, table, model, fields, rows):
+        started = time.perf_counter()
+        ids = writer.insert(model, fields, rows)
+        self.write_seconds[table] += time.perf_counter() - started
+        return ids
+
+    def _write_chunk(self, writer, offset, size):
+        plans = [self._plan_listing(offset + i) for i in range(size)]
+        listing_ids = self._insert(writer, "listings", Listing, LISTING_FIELDS, [listing for listing, _ in plans])
+
+        stays = [(listing_id, stay) for listing_id, (_, listing_stays) in zip(listing_ids, plans) for stay in listing_stays]
+        booking_ids = self._insert(writer, "bookings", Booking, BOOKING_FIELDS, [
+            (user_id, listing_id, check_in, check_out, self.now, self.now)
+            for listing_id, (user_id, check_in, check_out, *_rest) in stays
+        ])
+
+        reviews, payments = [], []
+        stamp = int(self.now.timestamp())
+        for booking_id, (listing_id, (user_id, _, _, amount, status, review)) in zip(booking_ids, stays):
+            if review:
+                reviews.append((user_id, listing_id, *review))
+            if status:
+                payments.append((
+                    user_id, booking_id, f"booking_{booking_id}", amount,
+                    f"booking_{booking_id}_{stamp}", status, self.now,
+                ))
+        self._insert(writer, "reviews", Review, REVIEW_FIELDS, reviews)
+        self._insert(writer, "payments", Payment, PAYMENT_FIELDS, payments)
+
+        # The listings are new, so their monthly rollup is computed from the plans rather than upserted
+        delta = StatsDelta()
+        for listing_id, (_, check_in, check_out, amount, status, _) in stays:
+            delta.add_stay(listing_id, check_in, check_out)
+            if status == "Completed":
+                delta.add_revenue(listing_id, check_in, amount)
+        stats = [(listing_id, month, *values) for (listing_id, month), values in sorted(delta.rows.items())]
+        self._insert(writer, "stats", ListingMonthlyStats, STATS_FIELDS, stats)
+
+        return {"listings": len(listing_ids), "bookings": len(booking_ids), "reviews": len(reviews),
+                "payments": len(payments), "stats": len(stats)}
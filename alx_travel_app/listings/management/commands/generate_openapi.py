@@ -0,0 +1,37 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from alx_travel_app.listings.schema import generate_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the OpenAPI schema served at /openapi.json to OPENAPI_SCHEMA_FILE. Run it at build time and "
+        "commit the result; with --check it only compares and fails when the file is stale (use it in CI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true",
+                            help="Exit with an error if the file differs from a fresh schema instead of writing it")
+
+    def handle(self, *args, **options):
+        path = Path(settings.OPENAPI_SCHEMA_FILE)
+        started = time.perf_counter()
+        body = generate_schema()
+        elapsed = time.perf_counter() - started
+
+        current = path.read_bytes() if path.exists() else None
+        if options["check"]:
+            if current != body:
+                raise CommandError(f"{path} is stale; regenerate it with: python manage.py generate_openapi")
+            self.stdout.write(self.style.SUCCESS(f"{path} is up to date"))
+            return
+
+        if current == body:
+            self.stdout.write(f"{path} unchanged (generated in {elapsed * 1000:.0f} ms)")
+            return
+        path.write_bytes(body)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path} ({len(body)} bytes, generated in {elapsed * 1000:.0f} ms)"))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from alx_travel_app.listings.analytics import rebuild_listing_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the monthly occupancy and revenue rollup (ListingMonthlyStats) from bookings and completed "
+        "payments. Run it once after migrating, and after loading data that bypassed the ORM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listing", type=int, action="append", dest="listings",
+                            help="Only rebuild this listing (repeatable)")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Listings rebuilt per transaction")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild_listing_stats(options["listings"], chunk_size=options["chunk_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} monthly stats rows in {elapsed:.1f}s."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from alx_travel_app.listings import cache as listing_cache
+from alx_travel_app.listings.models import Listing, Review
+
+
+class Command(BaseCommand):
+    help = "Recompute Listing.review_count and Listing.rating_sum from the reviews table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Listings updated per statement")
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.filter(property=OuterRef("pk")).order_by().values("property")
+        actual_count = Coalesce(Subquery(reviews.annotate(n=Count("id")).values("n")), 0)
+        actual_sum = Coalesce(Subquery(reviews.annotate(total=Sum("rating")).values("total")), 0)
+
+        # Only touch listings whose stored counters have drifted
+        drifted = list(
+            Listing.objects.annotate(actual_count=actual_count, actual_sum=actual_sum)
+            .exclude(review_count=F("actual_count"), rating_sum=F("actual_sum"))
+            .values_list("pk", flat=True)
+        )
+
+        batch_size = options["batch_size"]
+        for start in range(0, len(drifted), batch_size):
+            batch = drifted[start:start + batch_size]
+            with transaction.atomic():
+                Listing.objects.filter(pk__in=batch).update(
+                    review_count=actual_count, rating_sum=actual_sum, updated_at=timezone.now()
+                )
+                for pk in batch:
+                    transaction.on_commit(lambda pk=pk: listing_cache.invalidate_listing(pk))
+
+        self.stdout.write(self.style.SUCCESS(f"Repaired rating aggregates for {len(drifted)} listings."))
@@ -55,6 +55,7 @@ class Command(BaseCommand):
             # 5. Add a payment
             Payment.objects.get_or_create(
                 user=user,
+                booking=booking,
                 booking_reference=f"booking_{booking.id}",
                 amount=listing.price_per_night * (check_out - check_in).days,
                 transaction_id=f"tx_{i}{random.randint(1000,9999)}",
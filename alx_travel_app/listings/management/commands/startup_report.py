@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under -X importtime and prints its phase timings as JSON on the last stdout line
+PROBE = """
+import json, sys, time
+from django.apps import AppConfig
+
+apps_timings = {}
+_import_models = AppConfig.import_models
+
+def import_models(self):
+    started = time.perf_counter()
+    _import_models(self)
+    entry = apps_timings[self.label] = {"models": time.perf_counter() - started, "ready": 0.0}
+    ready = self.ready
+
+    def timed_ready():
+        started = time.perf_counter()
+        ready()
+        entry["ready"] = time.perf_counter() - started
+
+    self.ready = timed_ready
+
+AppConfig.import_models = import_models
+
+phases = []
+mark = time.perf_counter()
+
+def phase(name):
+    global mark
+    now = time.perf_counter()
+    phases.append((name, now - mark))
+    mark = now
+
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+phase("settings")
+django.setup()
+phase("django.setup (apps)")
+if sys.argv[1] == "web":
+    from django.core.wsgi import get_wsgi_application
+    get_wsgi_application()
+    phase("WSGI handler (middleware)")
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    phase("URLconf (views)")
+else:
+    from alx_travel_app.celery import app
+    app.loader.import_default_modules()
+    phase("Celery task modules")
+print(json.dumps({"phases": phases, "apps": apps_timings}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the project in a fresh interpreter (as a gunicorn or Celery worker would, without serving) and "
+        "report where startup time goes: per phase, per app (models import and ready()) and per imported "
+        "package, from python -X importtime."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", choices=["web", "celery"], default="web")
+        parser.add_argument("--top", type=int, default=15, help="Packages to list")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "alx_travel_app.settings")}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE, options["target"]],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Startup failed:\n{result.stderr[-2000:]}")
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        imports = self._parse_importtime(result.stderr)
+
+        total = sum(seconds for _, seconds in report["phases"])
+        self.stdout.write(f"Startup ({options['target']}): {total * 1000:.0f} ms")
+        for name, seconds in report["phases"]:
+            self.stdout.write(f"  {name:<32}{seconds * 1000:>9.1f} ms")
+
+        self.stdout.write(f"\n{'app':<28}{'models ms':>11}{'ready ms':>10}")
+        apps = sorted(report["apps"].items(), key=lambda item: -sum(item[1].values()))
+        for label, timing in apps:
+            self.stdout.write(f"{label:<28}{timing['models'] * 1000:>11.1f}{timing['ready'] * 1000:>10.1f}")
+
+        # Self time summed per top-level package, so nested imports are not counted twice
+        packages = defaultdict(lambda: [0, 0])
+        for module, self_us in imports:
+            entry = packages[module.split(".")[0]]
+            entry[0] += self_us
+            entry[1] += 1
+        imported_ms = sum(entry[0] for entry in packages.values()) / 1000
+        self.stdout.write(f"\nImports: {len(imports)} modules, {imported_ms:.0f} ms")
+        self.stdout.write(f"{'package':<28}{'ms':>9}{'modules':>9}")
+        for package, (self_us, count) in sorted(packages.items(), key=lambda item: -item[1][0])[:options["top"]]:
+            self.stdout.write(f"{package:<28}{self_us / 1000:>9.1f}{count:>9}")
+
+    @staticmethod
+    def _parse_importtime(stderr):
+        # "import time:   self [us] | cumulative | imported package"
+        imports = []
+        for line in stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            try:
+                self_us, _, module = line[len("import time:"):].split("|")
+                imports.append((module.strip(), int(self_us)))
+            except ValueError:
+                continue  # the header line
+        return imports
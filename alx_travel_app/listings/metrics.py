@@ -0,0 +1,210 @@
+# listings/metrics.py
+
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the request latency histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REDIS_KEY = "metrics:http"
+# Separates the parts of a series key; never appears in route names or regexes
+SEP = "\t"
+
+
+# ---------------------------------------------
+# Per-request timings
+# ---------------------------------------------
+class RequestTimings:
+    """
+    Time spent in the database and in outbound calls during one request
+    """
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.outbound = defaultdict(float)
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.db_queries += 1
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_outbound(service, seconds):
+    """
+    Charge an outbound HTTP call to the current request (no-op outside one)
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.outbound[service] += seconds
+
+
+# ---------------------------------------------
+# Cross-process aggregation
+# ---------------------------------------------
+class MetricsRegistry:
+    """
+    Counters for every request, aggregated across gunicorn workers.
+
+    Each process adds into a local dict under a lock (gthread serves
+    requests on several threads). Every METRICS_FLUSH_INTERVAL seconds the
+    pending deltas go to one Redis hash with HINCRBYFLOAT, which is atomic,
+    so the hash holds the sum over all processes. Without Redis the local
+    dict is the only copy and /metrics shows this process alone.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(float)
+        self._last_flush = time.monotonic()
+
+    def observe(self, route, method, status, timings, duration):
+        series = {
+            f"requests_total{SEP}{route}{SEP}{method}{SEP}{status}": 1,
+            f"duration_sum{SEP}{route}{SEP}{method}": duration,
+            f"duration_count{SEP}{route}{SEP}{method}": 1,
+            f"db_seconds_total{SEP}{route}{SEP}{method}": timings.db_seconds,
+            f"db_queries_total{SEP}{route}{SEP}{method}": timings.db_queries,
+        }
+        for service, seconds in timings.outbound.items():
+            series[f"outbound_seconds_total{SEP}{route}{SEP}{method}{SEP}{service}"] = seconds
+        # Buckets are stored cumulatively, as Prometheus expects them
+        for bound in DURATION_BUCKETS:
+            if duration <= bound:
+                series[f"duration_bucket{SEP}{route}{SEP}{method}{SEP}{bound}"] = 1
+        series[f"duration_bucket{SEP}{route}{SEP}{method}{SEP}+Inf"] = 1
+
+        with self._lock:
+            for key, value in series.items():
+                self._pending[key] += value
+            due = time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        client = get_redis()
+        if client is None:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, value in pending.items():
+                pipe.hincrbyfloat(REDIS_KEY, key, value)
+            pipe.execute()
+        except RedisError as e:
+            # Keep the deltas for the next attempt rather than losing them
+            logger.warning(f"Metrics flush failed: {str(e)}")
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending[key] += value
+
+    def snapshot(self):
+        """
+        Totals across all processes (or this process alone without Redis)
+        """
+        client = get_redis()
+        if client is not None:
+            self.flush()
+            try:
+                return {key.decode(): float(value) for key, value in client.hgetall(REDIS_KEY).items()}
+            except RedisError as e:
+                logger.warning(f"Metrics read failed: {str(e)}")
+        with self._lock:
+            return dict(self._pending)
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+        client = get_redis()
+        if client is not None:
+            client.delete(REDIS_KEY)
+
+
+registry = MetricsRegistry()
+
+
+# ---------------------------------------------
+# Prometheus text format
+# ---------------------------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _sample_order(sample):
+    # Group by series; histogram buckets first, in ascending bound order
+    kind, route, method, extra, _ = sample
+    is_bucket = kind == "duration_bucket"
+    bound = float("inf") if extra == "+Inf" else float(extra) if is_bucket else 0.0
+    return route, method, not is_bucket, bound, extra or "", kind
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render(snapshot):
+    """
+    Render a registry snapshot in the Prometheus text exposition format
+    """
+    families = {
+        "requests_total": ("http_requests_total", "counter", "Requests served.", "status"),
+        "duration": ("http_request_duration_seconds", "histogram", "Request latency.", "le"),
+        "db_seconds_total": ("http_request_db_seconds_total", "counter", "Time spent in SQL queries.", None),
+        "db_queries_total": ("http_request_db_queries_total", "counter", "SQL queries executed.", None),
+        "outbound_seconds_total": (
+            "http_request_outbound_seconds_total", "counter", "Time spent in outbound HTTP calls.", "service",
+        ),
+    }
+    grouped = defaultdict(list)
+    for key, value in snapshot.items():
+        kind, route, method, *extra = key.split(SEP)
+        family = "duration" if kind.startswith("duration_") else kind
+        grouped[family].append((kind, route, method, extra[0] if extra else None, value))
+
+    lines = []
+    for family, (name, metric_type, help_text, extra_label) in families.items():
+        samples = grouped.get(family)
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for kind, route, method, extra, value in sorted(samples, key=_sample_order):
+            suffix = kind[len("duration"):] if family == "duration" else ""
+            labels = {"route": route, "method": method}
+            if extra is not None:
+                labels[extra_label] = extra
+            lines.append(f"{name}{suffix}{_labels(**labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,50 @@
+# listings/middleware.py
+
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every request: total, SQL (time and query count) and outbound
+    Chapa calls. The figures go out in a Server-Timing header and into the
+    per-route histograms served at /metrics.
+
+    Keep it first in MIDDLEWARE so the total covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        duration = time.perf_counter() - started
+
+        metrics.registry.observe(self._route(request), request.method, response.status_code, timings, duration)
+        if settings.SERVER_TIMING_ENABLED:
+            parts = [f'db;dur={timings.db_seconds * 1000:.2f};desc="{timings.db_queries} queries"']
+            parts += [f"{service};dur={seconds * 1000:.2f}" for service, seconds in timings.outbound.items()]
+            parts.append(f"total;dur={duration * 1000:.2f}")
+            response["Server-Timing"] = ", ".join(parts)
+        return response
+
+    @staticmethod
+    def _route(request):
+        # URL names keep the label set small; ids never become label values
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unmatched"
+        return match.view_name or match.route
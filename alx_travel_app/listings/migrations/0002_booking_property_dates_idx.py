@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-17 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['property', 'check_in', 'check_out'], name='booking_property_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+import re
+
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+
+# Reference formats written so far: "booking_<id>_<timestamp>" (views),
+# "booking_<id>" and "BOOK-<id>" (seed commands)
+REFERENCE_PATTERN = re.compile(r"^(?:booking_|BOOK-)(\d+)(?:_\d+)?$")
+
+
+def backfill_payment_booking(apps, schema_editor):
+    Payment = apps.get_model("listings", "Payment")
+    Booking = apps.get_model("listings", "Booking")
+
+    last_id = 0
+    while True:
+        batch = list(
+            Payment.objects.filter(booking__isnull=True, id__gt=last_id)
+            .order_by("id")
+            .only("id", "booking_reference")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        parsed = {}
+        for payment in batch:
+            match = REFERENCE_PATTERN.match(payment.booking_reference or "")
+            if match:
+                parsed[payment.id] = int(match.group(1))
+
+        existing = set(
+            Booking.objects.filter(id__in=set(parsed.values())).values_list("id", flat=True)
+        )
+        resolved = []
+        for payment in batch:
+            booking_id = parsed.get(payment.id)
+            if booking_id in existing:
+                payment.booking_id = booking_id
+                resolved.append(payment)
+        Payment.objects.bulk_update(resolved, ["booking"])
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own so large tables are not locked for the whole backfill
+    atomic = False
+
+    dependencies = [
+        ("listings", "0004_payment_booking_fk"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_payment_booking, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-17 03:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0005_backfill_payment_booking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapaWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(blank=True, max_length=50)),
+                ('tx_ref', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('status', models.CharField(blank=True, max_length=20)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='webhook_events', to='listings.payment')),
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-17 04:20
+
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+# Half-open [check_in, check_out): a stay may start on the day the previous one ends
+ADD_OVERLAP_CONSTRAINT = """
+ALTER TABLE listings_booking ADD CONSTRAINT booking_no_overlap
+EXCLUDE USING gist (property_id WITH =, daterange(check_in, check_out, '[)') WITH &&)
+"""
+DROP_OVERLAP_CONSTRAINT = "ALTER TABLE listings_booking DROP CONSTRAINT IF EXISTS booking_no_overlap"
+
+
+def add_overlap_constraint(apps, schema_editor):
+    # Exclusion constraints are PostgreSQL-only; other backends keep the API check alone
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT count(*) FROM listings_booking a
+            JOIN listings_booking b
+              ON a.property_id = b.property_id AND a.id < b.id
+             AND a.check_in < b.check_out AND b.check_in < a.check_out
+        """)
+        clashes = cursor.fetchone()[0]
+    if clashes:
+        raise RuntimeError(
+            f"{clashes} pairs of overlapping bookings exist; resolve them before applying this migration."
+        )
+    schema_editor.execute(ADD_OVERLAP_CONSTRAINT)
+
+
+def drop_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_OVERLAP_CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0009_outbox_message'),
+    ]
+
+    operations = [
+        # Lets the GiST index compare property_id with "="; a no-op off PostgreSQL
+        BtreeGistExtension(),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.CheckConstraint(check=models.Q(('check_out__gt', models.F('check_in'))), name='booking_dates_ordered'),
+        ),
+        migrations.RunPython(add_overlap_constraint, drop_overlap_constraint),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-17 07:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0011_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('booked_nights', models.PositiveIntegerField(default=0)),
+                ('booking_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('property', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to='listings.listing')),
+            ],
+            options={
+                'verbose_name_plural': 'listing monthly stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='listingmonthlystats',
+            index=models.Index(fields=['month', 'id'], name='monthly_stats_month_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='listingmonthlystats',
+            constraint=models.UniqueConstraint(fields=('property', 'month'), name='listing_month_uniq'),
+        ),
+    ]
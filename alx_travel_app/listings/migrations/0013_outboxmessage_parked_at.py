@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0012_listing_monthly_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='parked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-17 09:40
+
+import alx_travel_app.listings.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_outboxmessage_parked_at'),
+    ]
+
+    operations = [
+        # 0010 already created booking_no_overlap with the same definition
+        # (raw SQL, PostgreSQL only); this records it in the migration state
+        # so later schema changes know about it. No SQL is run, and
+        # PostgresExclusionConstraint keeps table remakes on other backends
+        # from emitting it.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='booking',
+                    constraint=alx_travel_app.listings.models.PostgresExclusionConstraint(expressions=[('property', '='), (alx_travel_app.listings.models.DateRange('check_in', 'check_out', models.Value('[)')), '&&')], name='booking_no_overlap'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_booking_no_overlap_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,111 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from . import cache as listing_cache
+
+
+# ---------------------------------------------
+# Conditional GET (ETag / Last-Modified)
+# ---------------------------------------------
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified to list and retrieve responses and answers
+    If-None-Match / If-Modified-Since with 304 before anything is serialized.
+
+    The validators come from one aggregate over exactly the rows the
+    response would contain (the current page, or the single object):
+    the newest of `last_modified_fields`, plus the row count and id sum so
+    that deletions and rows sliding into the page also change the ETag.
+    """
+    # Timestamps whose change alters the response body
+    last_modified_fields = ("updated_at",)
+
+    def get_conditional_version(self, queryset):
+        aggregates = {f"last_{i}": Max(field) for i, field in enumerate(self.last_modified_fields)}
+        version = queryset.aggregate(rows=Count("pk"), checksum=Sum("pk"), **aggregates)
+        if not version["rows"]:
+            return None
+
+        timestamps = [version[f"last_{i}"] for i in range(len(self.last_modified_fields))]
+        last_modified = max(ts for ts in timestamps if ts is not None)
+        fingerprint = "|".join([
+            self.request.build_absolute_uri(),
+            self.request.accepted_media_type or "",
+            str(version["rows"]),
+            str(version["checksum"]),
+            *(ts.isoformat() if ts else "" for ts in timestamps),
+        ])
+        etag = quote_etag(hashlib.sha256(fingerprint.encode()).hexdigest())
+        return etag, int(last_modified.timestamp())
+
+    def conditional(self, request, queryset, build_response):
+        version = self.get_conditional_version(queryset)
+        if version is None:
+            # Empty page or missing object: let the normal path answer
+            return build_response()
+
+        etag, last_modified = version
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build_response()
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            queryset = self.paginator.get_page_queryset(queryset, request, self)
+        return self.conditional(
+            request, queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            # Malformed lookup value: the normal path turns this into a 404
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional(
+            request, queryset, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
+
+
+# ---------------------------------------------
+# Listing response cache
+# ---------------------------------------------
+class ListingCacheMixin:
+    """
+    Serves list and retrieve bodies from listings/cache.py. Availability
+    searches bypass the cache because they depend on bookings.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if "check_in" in request.query_params or "check_out" in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        data = listing_cache.get_or_build(
+            listing_cache.list_key(request),
+            lambda: super(ListingCacheMixin, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs.get(self.lookup_url_kwarg or self.lookup_field, ""))
+        if not pk.isdigit():
+            return super().retrieve(request, *args, **kwargs)
+
+        data = listing_cache.get_or_build(
+            listing_cache.detail_key(int(pk)),
+            lambda: super(ListingCacheMixin, self).retrieve(request, *args, **kwargs).data,
+        )
+        return Response(data)
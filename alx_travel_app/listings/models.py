@@ -1,9 +1,41 @@
 from django.db import models
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeOperators
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.functions import Cast, Coalesce, NullIf
 
 
 User = get_user_model()
+# ---------------------------------------------
+# Listing queryset: availability search
+# ---------------------------------------------
+class ListingQuerySet(models.QuerySet):
+    def available_between(self, check_in, check_out):
+        """
+        Listings with no booking overlapping [check_in, check_out).
+
+        Compiles to a single NOT EXISTS anti-join, answered from
+        booking_property_dates_idx for each candidate listing.
+        """
+        clashes = Booking.objects.overlapping(check_in, check_out).filter(property=models.OuterRef('pk'))
+        return self.filter(~models.Exists(clashes))
+
+    def with_average_rating(self):
+        """
+        Annotate average_rating from the denormalized columns (0 when unrated).
+        A per-row division, so sorting by rating never aggregates reviews.
+        """
+        return self.annotate(
+            average_rating=Coalesce(
+                Cast('rating_sum', models.FloatField()) / NullIf('review_count', 0),
+                0.0,
+                output_field=models.FloatField(),
+            )
+        )
+
+
 # ---------------------------------------------
 # Listing model: represents a rental property listing
 # ---------------------------------------------
@@ -16,12 +48,65 @@ class Listing(models.Model):
     location = models.CharField(max_length=255)        # Address or coordinates of the property
     price_per_night = models.DecimalField(
         max_digits=10, decimal_places=2)               # Rental price per night (e.g., 99.99)
+    updated_at = models.DateTimeField(auto_now=True)   # Last change; drives ETag / Last-Modified
+
+    # Denormalized review aggregates, kept current by signals.py
+    # (repair with `manage.py recompute_listing_ratings`)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+
+    objects = ListingQuerySet.as_manager()
 
     def __str__(self):
         # Return a human-readable representation of the property
         return self.title
 
 
+# ---------------------------------------------
+# Booking queryset: reusable date-range filters
+# ---------------------------------------------
+class BookingQuerySet(models.QuerySet):
+    def overlapping(self, check_in, check_out):
+        """
+        Bookings whose stay intersects the half-open range [check_in, check_out).
+        """
+        return self.filter(check_in__lt=check_out, check_out__gt=check_in)
+
+
+BOOKING_OVERLAP_CONSTRAINT = 'booking_no_overlap'
+
+
+class DateRange(models.Func):
+    """
+    daterange(lower, upper, bounds) on PostgreSQL
+    """
+    function = 'DATERANGE'
+    output_field = DateRangeField()
+
+
+class PostgresExclusionConstraint(ExclusionConstraint):
+    """
+    ExclusionConstraint that emits no SQL off PostgreSQL, so a table remake
+    on another backend (SQLite rebuilds tables for most ALTERs) skips it
+    instead of failing on EXCLUDE USING gist
+    """
+
+    def constraint_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().constraint_sql(model, schema_editor)
+
+    def create_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().create_sql(model, schema_editor)
+
+    def remove_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().remove_sql(model, schema_editor)
+
+
 # ---------------------------------------------
 # Booking model: links a user to a property for specific dates
 # ---------------------------------------------
@@ -43,6 +128,31 @@ class Booking(models.Model):
 
     check_in = models.DateField()                       # Start date of stay
     check_out = models.DateField()                       # End date of stay
+    created_at = models.DateTimeField(auto_now_add=True)  # When the booking was made
+    updated_at = models.DateTimeField(auto_now=True)      # Last change; drives ETag / Last-Modified
+
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves the availability anti-join: equality on property, range on dates
+            models.Index(fields=['property', 'check_in', 'check_out'], name='booking_property_dates_idx'),
+            # Keyset pagination seeks on (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='booking_created_id_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(check_out__gt=models.F('check_in')), name='booking_dates_ordered'),
+            # No two bookings of one listing may share a night. Half-open
+            # [check_in, check_out), so a stay may start the day the previous
+            # one ends. GiST on property_id needs btree_gist (migration 0010).
+            PostgresExclusionConstraint(
+                name=BOOKING_OVERLAP_CONSTRAINT,
+                expressions=[
+                    ('property', RangeOperators.EQUAL),
+                    (DateRange('check_in', 'check_out', models.Value('[)')), RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
 
     def __str__(self):
         # Return a readable summary of the booking
@@ -87,13 +197,132 @@ class Payment(models.Model):
         ('Completed', 'Completed'),
         ('Failed', 'Failed'),
     ]
+    # A booking with a payment in one of these states cannot be paid again
+    ACTIVE_STATUSES = ('Pending', 'Completed')
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    booking = models.ForeignKey(
+        'Booking',
+        on_delete=models.SET_NULL,                     # Keep the payment record if the booking is removed
+        related_name='payments',                       # Allows reverse lookup: booking.payments.all()
+        null=True,
+        blank=True,
+        db_index=False,                                # Covered by payment_booking_status_idx
+    )
     booking_reference = models.CharField(max_length=100)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     transaction_id = models.CharField(max_length=100, blank=True, null=True)
     payment_status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Verified-payments listing: filter on status, keyset on (created_at, id)
+            models.Index(fields=['payment_status', 'created_at', 'id'], name='payment_status_created_idx'),
+            # "Does this booking already have an active payment?" lookups
+            models.Index(fields=['booking', 'payment_status'], name='payment_booking_status_idx'),
+            # Gateway callbacks and reconciliation look payments up by transaction id
+            models.Index(fields=['transaction_id'], name='payment_transaction_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.booking_reference} - {self.payment_status}"
+
+
+# ---------------------------------------------
+# ChapaWebhookEvent model: raw record of each signed Chapa callback
+# ---------------------------------------------
+class ChapaWebhookEvent(models.Model):
+    event = models.CharField(max_length=50, blank=True)
+    tx_ref = models.CharField(max_length=100, blank=True, db_index=True)
+    status = models.CharField(max_length=20, blank=True)
+    payload = models.JSONField()
+    payment = models.ForeignKey(
+        'Payment', on_delete=models.SET_NULL, null=True, blank=True, related_name='webhook_events'
+    )
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event or 'webhook'} {self.tx_ref} ({self.status})"
+
+
+# ---------------------------------------------
+# OutboxMessage model: side effects committed with the data that caused them
+# ---------------------------------------------
+class OutboxMessage(models.Model):
+    """
+    A notification recorded in the same transaction as a payment change.
+
+    Rows only become visible when that transaction commits, so a rolled-back
+    payment never notifies anyone. The dispatch_outbox task hands them to
+    Celery after commit (and on a slower beat sweep) and deletes them once
+    published.
+    """
+    event = models.CharField(max_length=50)             # Key into tasks.OUTBOX_HANDLERS
+    payload = models.JSONField()                        # Keyword arguments for the handler
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    parked_at = models.DateTimeField(null=True, blank=True)  # Set after OUTBOX_MAX_ATTEMPTS failures; no longer dispatched
+    leased_until = models.DateTimeField(null=True, blank=True)  # Claimed by a dispatcher; others skip it until then
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event} {self.payload}"
+
+
+# ---------------------------------------------
+# IdempotencyKey model: stored result of a request sent with an Idempotency-Key header
+# ---------------------------------------------
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)                  # Client-chosen Idempotency-Key header value
+    fingerprint = models.CharField(max_length=64)           # sha256 of method, path and body
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # purge_idempotency_keys scans by age
+
+    class Meta:
+        constraints = [
+            # One row per key: a concurrent duplicate cannot claim it, it sees the pending row instead
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code or 'pending'})"
+
+
+# ---------------------------------------------
+# ListingMonthlyStats model: occupancy and revenue rollup per listing and month
+# ---------------------------------------------
+class ListingMonthlyStats(models.Model):
+    """
+    Bookings and completed payments of one listing, summed per calendar month.
+
+    Kept current incrementally by signals.py and by the bulk write paths
+    (see analytics.py); rebuild with `manage.py rebuild_listing_stats`.
+    """
+    property = models.ForeignKey(
+        'Listing',
+        on_delete=models.CASCADE,
+        related_name='monthly_stats',
+        db_index=False,                                 # Covered by listing_month_uniq
+    )
+    month = models.DateField()                          # First day of the month
+    booked_nights = models.PositiveIntegerField(default=0)  # Nights of any stay that fall in this month
+    booking_count = models.PositiveIntegerField(default=0)  # Bookings checking in this month
+    revenue = models.DecimalField(                      # Completed payments of those bookings
+        max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # One row per listing and month; also the target of the incremental upserts
+            models.UniqueConstraint(fields=['property', 'month'], name='listing_month_uniq'),
+        ]
+        indexes = [
+            # Dashboard pages across listings: range on month, keyset on (month, id)
+            models.Index(fields=['month', 'id'], name='monthly_stats_month_id_idx'),
+        ]
+        verbose_name_plural = 'listing monthly stats'
+
     def __str__(self):
-        return f"{self.booking_reference} - {self.payment_status}"
\ No newline at end of file
+        return f"{self.property_id} {self.month:%Y-%m}"
@@ -0,0 +1,198 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# ------------------------
+# Keyset (cursor) pagination
+# ------------------------
+class KeysetPagination(BasePagination):
+    """
+    Opaque-cursor pagination that seeks on the ordering columns instead of
+    using OFFSET, so page 1000 costs the same as page 1. No COUNT(*) is run.
+
+    `ordering` must end with a unique column (normally `id`) so that every
+    row has a distinct position.
+    """
+    ordering = ("-id",)
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        rows = list(self.get_page_queryset(queryset, request, view))
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_ordering(self, request, view=None):
+        """
+        Views may pick another keyset per request via `get_keyset_ordering()`
+        """
+        if view is not None and hasattr(view, "get_keyset_ordering"):
+            return view.get_keyset_ordering() or self.ordering
+        return self.ordering
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        The unevaluated, sliced queryset behind one page (plus one look-ahead row)
+        """
+        self.ordering = self.get_ordering(request, view)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            position = self.clean_position(queryset, position)
+            queryset = queryset.filter(self.get_seek_filter(position))
+
+        # Fetch one extra row to learn whether a next page exists
+        return queryset[:self.get_page_size(request) + 1]
+
+    def clean_position(self, queryset, position):
+        """
+        Convert each cursor value with its ordering field (or annotation),
+        so a tampered cursor is a 404 rather than a database error
+        """
+        cleaned = []
+        for name, value in zip(self.ordering, position):
+            name = name.lstrip("-")
+            annotation = queryset.query.annotations.get(name)
+            field = annotation.output_field if annotation is not None else queryset.model._meta.get_field(name)
+            try:
+                if value is None:
+                    raise ValidationError("Cursor values are never null")
+                cleaned.append(field.to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_seek_filter(self, position):
+        """
+        Rows strictly after `position` in the ordering.
+
+        For (-created_at, -id) this yields
+            created_at <= c AND (created_at < c OR (created_at = c AND id < i))
+        The leading bound is a plain range on the first index column, so the
+        database starts the index scan at the cursor rather than filtering
+        every earlier row.
+        """
+        fields = [(name.lstrip("-"), name.startswith("-")) for name in self.ordering]
+        first, first_desc = fields[0]
+
+        after = Q()
+        for index, (name, descending) in enumerate(fields):
+            step = Q(**{f"{name}__{'lt' if descending else 'gt'}": position[index]})
+            for prev in range(index):
+                step &= Q(**{fields[prev][0]: position[prev]})
+            after |= step
+        if len(fields) == 1:
+            return after
+
+        bound = Q(**{f"{first}__{'lte' if first_desc else 'gte'}": position[0]})
+        return bound & after
+
+    def encode_cursor(self, instance):
+        values = []
+        for name in self.ordering:
+            value = getattr(instance, name.lstrip("-"))
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            elif value is not None and not isinstance(value, (int, float)):
+                value = str(value)
+            values.append(value)
+        token = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        return token.rstrip("=")
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (binascii.Error, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opaque cursor taken from the `next` link of the previous page.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Number of results per page (max {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class ListingCursorPagination(KeysetPagination):
+    ordering = ("id",)
+
+
+class BookingCursorPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
+
+
+class PaymentCursorPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
+
+
+class ReviewCursorPagination(KeysetPagination):
+    ordering = ("-id",)
+
+
+class MonthlyStatsCursorPagination(KeysetPagination):
+    # monthly_stats_month_id_idx; dashboards read months in calendar order
+    ordering = ("month", "id")
+    page_size = 200
+    max_page_size = 1000
@@ -0,0 +1,83 @@
+# listings/schema.py
+
+import functools
+import hashlib
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.utils.http import quote_etag
+from drf_yasg import openapi
+
+logger = logging.getLogger(__name__)
+
+API_INFO = openapi.Info(
+    title="Travel App API",
+    default_version="v1",
+    description="API documentation for the travel app",
+)
+
+
+def generate_schema():
+    """
+    Introspect every API view and serializer and return the OpenAPI
+    document as JSON bytes. Slow (hundreds of ms); run it at build time.
+    """
+    # Not imported at startup: only this command-time path needs them
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    generator = OpenAPISchemaGenerator(info=API_INFO)
+    schema = generator.get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[], pretty=True).encode(schema) + b"\n"
+
+
+class SchemaArtifact:
+    """
+    The generated schema file (OPENAPI_SCHEMA_FILE) held in memory with its
+    ETag. Re-read only when the file changes on disk; if it is missing the
+    schema is generated once in this process instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.body = None
+        self.etag = None
+
+    def load(self):
+        path = settings.OPENAPI_SCHEMA_FILE
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with self._lock:
+            if self.body is None or (mtime is not None and mtime != self._mtime):
+                if mtime is None:
+                    logger.warning(f"{path} not found; generating the OpenAPI schema in-process "
+                                   f"(run manage.py generate_openapi at build time)")
+                    body = generate_schema()
+                else:
+                    with open(path, "rb") as f:
+                        body = f.read()
+                self.body, self._mtime = body, mtime
+                self.etag = quote_etag(hashlib.sha256(body).hexdigest()[:32])
+            return self.body, self.etag
+
+
+artifact = SchemaArtifact()
+
+
+@functools.lru_cache(maxsize=None)
+def swagger_ui():
+    """
+    The drf-yasg Swagger UI view, built on first use so that drf_yasg.views
+    (and its renderers) stay out of worker startup
+    """
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    schema_view = get_schema_view(API_INFO, public=True, permission_classes=[permissions.AllowAny])
+    # Cached because the root URL redirects here and is hit by health checks and crawlers
+    return schema_view.with_ui("swagger", cache_timeout=60 * 60)
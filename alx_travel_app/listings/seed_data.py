@@ -61,6 +61,7 @@ class Command(BaseCommand):
         for booking in Booking.objects.all()[:5]:
             Payment.objects.create(
                 user=user,
+                booking=booking,
                 booking_reference=f"BOOK-{booking.id}",
                 amount=booking.property.price_per_night * 3,
                 payment_status=random.choice(["Pending", "Completed", "Failed"]),
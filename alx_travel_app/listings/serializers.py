@@ -1,5 +1,13 @@
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
-from .models import Listing, Booking, Review, Payment
+from .analytics import StatsDelta, days_in_month, month_start
+from .models import Listing, Booking, Review, Payment, ListingMonthlyStats
 
 # ------------------------
 # Listing Serializer
@@ -7,15 +15,49 @@ from .models import Listing, Booking, Review, Payment
 
 class ListingSerializer(serializers.ModelSerializer):
     price_display = serializers.SerializerMethodField()
+    average_rating = serializers.SerializerMethodField()
 
     class Meta:
         model = Listing
-        fields = ['id', 'title', 'description', 'location', 'price_per_night', 'price_display']
+        fields = ['id', 'title', 'description', 'location', 'price_per_night', 'price_display',
+                  'review_count', 'average_rating']
+        read_only_fields = ['review_count']
 
     def get_price_display(self, obj):
         # Return a formatted price string (e.g., "$150.00 per night")
         return f"${obj.price_per_night:.2f} per night"
 
+    def get_average_rating(self, obj):
+        # Computed from the denormalized columns; never aggregates reviews
+        if not obj.review_count:
+            return None
+        return round(obj.rating_sum / obj.review_count, 2)
+
+
+# Query parameters for the listing availability search
+class AvailabilityQuerySerializer(serializers.Serializer):
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+
+    def validate(self, data):
+        # Same rule as bookings: the range must cover at least one night
+        if data['check_out'] <= data['check_in']:
+            raise serializers.ValidationError("Check-out date must be after check-in date.")
+        return data
+
+
+# Query parameters of the CSV / NDJSON exports. "format" is taken by DRF's
+# format override, hence "output".
+class ExportQuerySerializer(serializers.Serializer):
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+    output = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+
+    def validate(self, data):
+        if 'since' in data and 'until' in data and data['until'] < data['since']:
+            raise serializers.ValidationError("until must not be before since.")
+        return data
+
 
 # ------------------------
 # Booking Serializer
@@ -27,7 +69,7 @@ class BookingSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Booking
-        fields = ['id', 'user', 'user_email', 'property', 'property_title', 'check_in', 'check_out']
+        fields = ['id', 'user', 'user_email', 'property', 'property_title', 'check_in', 'check_out', 'created_at']
 
     def validate(self, data):
         # Ensure check_out is after check_in
@@ -36,6 +78,127 @@ class BookingSerializer(serializers.ModelSerializer):
         return data
 
 
+# ------------------------
+# Bulk Booking Serializers
+# ------------------------
+
+# One row of a bulk booking import; references are checked in bulk afterwards
+class BookingBulkItemSerializer(serializers.Serializer):
+    user = serializers.IntegerField(min_value=1, required=False)
+    property = serializers.IntegerField(min_value=1)
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+
+    def validate(self, data):
+        if data['check_out'] <= data['check_in']:
+            raise serializers.ValidationError("Check-out date must be after check-in date.")
+        return data
+
+
+class BookingBulkCreateSerializer(serializers.Serializer):
+    """
+    Validates a batch of bookings with a fixed number of queries, whatever
+    its size: one each for unknown listings and users, and one for clashes
+    with existing bookings. Rows are also checked against each other.
+    Errors come back per row, in input order. Nothing is inserted unless
+    every row is valid.
+    """
+    bookings = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=settings.BOOKING_BULK_MAX_ROWS
+    )
+
+    def validate_bookings(self, rows):
+        errors = [{} for _ in rows]
+        items = {}
+        for index, row in enumerate(rows):
+            item = BookingBulkItemSerializer(data=row)
+            if item.is_valid():
+                items[index] = dict(item.validated_data)
+                items[index].setdefault('user', self.context['request'].user.pk)
+            else:
+                errors[index] = item.errors
+
+        self._check_references(items, errors)
+        self._check_overlaps(items, errors)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return [items[index] for index in range(len(rows))]
+
+    def _check_references(self, items, errors):
+        listing_ids = {item['property'] for item in items.values()}
+        user_ids = {item['user'] for item in items.values()}
+        known_listings = set(Listing.objects.filter(id__in=listing_ids).values_list('id', flat=True))
+        known_users = set(get_user_model().objects.filter(id__in=user_ids).values_list('id', flat=True))
+
+        for index, item in list(items.items()):
+            if item['property'] not in known_listings:
+                errors[index] = {'property': [f"Invalid pk \"{item['property']}\" - object does not exist."]}
+            elif item['user'] not in known_users:
+                errors[index] = {'user': [f"Invalid pk \"{item['user']}\" - object does not exist."]}
+            else:
+                continue
+            del items[index]
+
+    def _check_overlaps(self, items, errors):
+        if not items:
+            return
+
+        # Within the batch: walk each listing's rows in check-in order
+        by_listing = defaultdict(list)
+        for index, item in items.items():
+            by_listing[item['property']].append(index)
+        for indexes in by_listing.values():
+            indexes.sort(key=lambda i: items[i]['check_in'])
+            latest = None
+            for index in indexes:
+                if latest is not None and items[index]['check_in'] < items[latest]['check_out']:
+                    errors[index] = {'non_field_errors': [f"Overlaps row {latest} of this batch."]}
+                if latest is None or items[index]['check_out'] > items[latest]['check_out']:
+                    latest = index
+
+        # Against the database: one range query over the batch's listings and dates
+        existing = defaultdict(list)
+        for listing_id, check_in, check_out in (
+            Booking.objects.filter(property_id__in=by_listing.keys())
+            .overlapping(
+                min(item['check_in'] for item in items.values()),
+                max(item['check_out'] for item in items.values()),
+            )
+            .order_by('property_id', 'check_in')
+            .values_list('property_id', 'check_in', 'check_out')
+        ):
+            existing[listing_id].append((check_in, check_out))
+
+        for listing_id, stays in existing.items():
+            starts = [check_in for check_in, _ in stays]
+            latest_end = list(accumulate((check_out for _, check_out in stays), max))
+            for index in by_listing[listing_id]:
+                # Bookings starting before this check-out; does any end after this check-in?
+                position = bisect_left(starts, items[index]['check_out'])
+                if position and latest_end[position - 1] > items[index]['check_in']:
+                    errors[index] = {'non_field_errors': ["Overlaps an existing booking for this listing."]}
+
+    def create(self, validated_data):
+        bookings = [
+            Booking(
+                user_id=item['user'],
+                property_id=item['property'],
+                check_in=item['check_in'],
+                check_out=item['check_out'],
+            )
+            for item in validated_data['bookings']
+        ]
+        with transaction.atomic():
+            bookings = Booking.objects.bulk_create(bookings, batch_size=500)
+            # bulk_create sends no signals, so the monthly rollup is updated here
+            delta = StatsDelta()
+            for booking in bookings:
+                delta.add_stay(booking.property_id, booking.check_in, booking.check_out)
+            delta.apply()
+        return bookings
+
+
 # ------------------------
 # Review Serializer
 # ------------------------
@@ -63,9 +226,39 @@ class PaymentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Payment
-        fields = ['id', 'user', 'user_email', 'booking_reference', 'amount', 'transaction_id', 'payment_status', 'created_at']
+        fields = ['id', 'user', 'user_email', 'booking', 'booking_reference', 'amount', 'transaction_id', 'payment_status', 'created_at']
         
 # Input serializer for initiating payment
 class PaymentInputSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
-    currency = serializers.CharField(max_length=3, default="ETB", required=False)
\ No newline at end of file
+    currency = serializers.CharField(max_length=3, default="ETB", required=False)
+
+
+# ------------------------
+# Monthly Listing Stats Serializers
+# ------------------------
+class ListingMonthlyStatsSerializer(serializers.ModelSerializer):
+    occupancy = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ListingMonthlyStats
+        fields = ['property', 'month', 'booked_nights', 'booking_count', 'revenue', 'occupancy']
+
+    def get_occupancy(self, obj) -> float:
+        # Share of the month's nights that are booked
+        return round(obj.booked_nights / days_in_month(obj.month), 4)
+
+
+class ListingMonthlyStatsQuerySerializer(serializers.Serializer):
+    property = serializers.IntegerField(required=False, min_value=1)
+    # Any day selects its whole month
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+
+    def validate(self, data):
+        for name in ('since', 'until'):
+            if name in data:
+                data[name] = month_start(data[name])
+        if 'since' in data and 'until' in data and data['until'] < data['since']:
+            raise serializers.ValidationError("until must not be before since.")
+        return data
@@ -0,0 +1,202 @@
+# listings/signals.py
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cache as listing_cache
+from .analytics import StatsDelta, completed_revenue
+from .models import Booking, Listing, Payment, Review
+
+
+# ---------------------------------------------
+# Listing cache invalidation
+# ---------------------------------------------
+@receiver([post_save, post_delete], sender=Listing)
+def invalidate_listing_cache(sender, instance, **kwargs):
+    # After commit, so a request racing the write cannot re-cache the old row
+    pk = instance.pk
+    transaction.on_commit(lambda: listing_cache.invalidate_listing(pk))
+
+
+# ---------------------------------------------
+# Listing rating aggregates (review_count / rating_sum)
+# ---------------------------------------------
+def adjust_listing_rating(listing_id, count_delta, sum_delta):
+    """
+    Apply a review change to a listing's counters in one atomic UPDATE.
+
+    Queryset updates bypass Listing signals, so the cache is invalidated
+    here and updated_at is bumped so ETags change.
+    """
+    Listing.objects.filter(pk=listing_id).update(
+        review_count=F('review_count') + count_delta,
+        rating_sum=F('rating_sum') + sum_delta,
+        updated_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: listing_cache.invalidate_listing(listing_id))
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, raw=False, **kwargs):
+    # An edit may change the rating or move the review to another listing
+    instance._previous_rating = None
+    if instance.pk and not raw:
+        instance._previous_rating = (
+            Review.objects.filter(pk=instance.pk).values_list('property_id', 'rating').first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def apply_review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        adjust_listing_rating(instance.property_id, 1, instance.rating)
+        return
+
+    old_listing_id, old_rating = previous
+    if old_listing_id != instance.property_id:
+        adjust_listing_rating(old_listing_id, -1, -old_rating)
+        adjust_listing_rating(instance.property_id, 1, instance.rating)
+    elif old_rating != instance.rating:
+        adjust_listing_rating(instance.property_id, 0, instance.rating - old_rating)
+
+
+@receiver(post_delete, sender=Review)
+def apply_review_deleted(sender, instance, **kwargs):
+    adjust_listing_rating(instance.property_id, -1, -instance.rating)
+
+
+# ---------------------------------------------
+# Authenticated user cache invalidation
+# ---------------------------------------------
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_user_cache(sender, instance, **kwargs):
+    # Covers deactivation and password changes; queryset updates bypass it.
+    # Dropped now and again after commit, so a request racing the write
+    # cannot re-cache the old row.
+    # Imported here: simplejwt and DRF stay out of Celery worker startup
+    from .authentication import user_cache
+
+    pk = instance.pk
+    user_cache.invalidate(pk)
+    transaction.on_commit(lambda: user_cache.invalidate(pk))
+
+
+# ---------------------------------------------
+# Booking ETags
+# ---------------------------------------------
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def touch_user_bookings(sender, instance, created, update_fields=None, **kwargs):
+    # BookingSerializer shows user.email, but the user row has no timestamp
+    # for BookingViewSet.last_modified_fields; bump the bookings' instead.
+    # Logins only save last_login and are skipped.
+    if created or (update_fields is not None and "email" not in update_fields):
+        return
+    Booking.objects.filter(user_id=instance.pk).update(updated_at=timezone.now())
+
+
+# ---------------------------------------------
+# Monthly occupancy and revenue rollups (see analytics.py)
+# ---------------------------------------------
+def _deleted_with(origin, model):
+    # The object or queryset whose delete() started the cascade
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+@receiver(pre_save, sender=Booking)
+def remember_previous_stay(sender, instance, raw=False, **kwargs):
+    # A reschedule or a move to another listing shifts nights and revenue
+    instance._previous_stay = None
+    if instance.pk and not raw:
+        instance._previous_stay = (
+            Booking.objects.filter(pk=instance.pk).values_list('property_id', 'check_in', 'check_out').first()
+        )
+
+
+@receiver(post_save, sender=Booking)
+def apply_booking_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_stay', None)
+    current = (instance.property_id, instance.check_in, instance.check_out)
+    if not created and previous == current:
+        return
+
+    delta = StatsDelta()
+    delta.add_stay(*current)
+    if not created and previous is not None:
+        delta.add_stay(*previous, sign=-1)
+        old_listing_id, old_check_in, _ = previous
+        revenue = completed_revenue([instance.pk]).get(instance.pk, 0)
+        delta.add_revenue(old_listing_id, old_check_in, -revenue)
+        delta.add_revenue(instance.property_id, instance.check_in, revenue)
+    delta.apply()
+
+
+@receiver(pre_delete, sender=Booking)
+def apply_booking_deleted(sender, instance, origin=None, **kwargs):
+    # Deleting the listing drops its rollup rows anyway
+    if _deleted_with(origin, Listing):
+        return
+    delta = StatsDelta()
+    delta.add_stay(instance.property_id, instance.check_in, instance.check_out, sign=-1)
+    # Payments are kept (SET_NULL) but no longer belong to the booking
+    revenue = completed_revenue([instance.pk]).get(instance.pk, 0)
+    delta.add_revenue(instance.property_id, instance.check_in, -revenue)
+    delta.apply()
+
+
+def _counted_revenue(booking_id, payment_status, amount):
+    # (booking_id, amount) of a payment that counts as revenue; amount may still be a string before a refresh
+    return (booking_id, Decimal(str(amount))) if booking_id and payment_status == 'Completed' else None
+
+
+@receiver(pre_save, sender=Payment)
+def remember_previous_payment(sender, instance, raw=False, **kwargs):
+    instance._previous_revenue = None
+    if instance.pk and not raw:
+        previous = (
+            Payment.objects.filter(pk=instance.pk).values_list('booking_id', 'payment_status', 'amount').first()
+        )
+        instance._previous_revenue = _counted_revenue(*previous) if previous else None
+
+
+@receiver(post_save, sender=Payment)
+def apply_payment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_revenue', None)
+    current = _counted_revenue(instance.booking_id, instance.payment_status, instance.amount)
+    if previous == current:
+        return
+    amounts = defaultdict(Decimal)
+    if previous:
+        amounts[previous[0]] -= previous[1]
+    if current:
+        amounts[current[0]] += current[1]
+    delta = StatsDelta()
+    delta.add_booking_revenue(amounts)
+    delta.apply()
+
+
+@receiver(post_delete, sender=Payment)
+def apply_payment_deleted(sender, instance, origin=None, **kwargs):
+    # A payment deleted with its user goes with that user's bookings, which
+    # already took their revenue out; rebuild_listing_stats covers the rest
+    if not _deleted_with(origin, Payment):
+        return
+    counted = _counted_revenue(instance.booking_id, instance.payment_status, instance.amount)
+    if counted:
+        delta = StatsDelta()
+        delta.add_booking_revenue({counted[0]: -counted[1]})
+        delta.apply()
@@ -1,26 +1,485 @@
 # listings/tasks.py
+import json
+import logging
+import smtplib
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
-from .models import Booking
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from kombu.exceptions import OperationalError as KombuOperationalError
+from redis.exceptions import RedisError
+from .analytics import StatsDelta
+from .models import Booking, Payment, OutboxMessage, IdempotencyKey
+from .utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Redis list holding confirmation emails waiting for the next batch
+EMAIL_QUEUE_KEY = "mail:confirmations"
+# Each flush moves its batch to a processing list of its own, registered
+# in this sorted set (scored by claim time) until the batch is sent
+EMAIL_PROCESSING_KEY = "mail:confirmations:processing"
+CONFIRMATION_EVENT = "payment_confirmation"
+
+
+# ---------------------------------------------
+# Notification deduplication
+# ---------------------------------------------
+def _dedup_key(event, booking_id):
+    return f"tasks:dedup:{event}:{booking_id}"
+
+
+def claim_notification(event, booking_id):
+    """
+    True the first time (event, booking) is seen within TASK_DEDUP_TTL seconds.
+
+    cache.add is an atomic SET NX, so concurrent requests (pay, webhook,
+    reconciliation, client retries) cannot both claim the same notification.
+    If the cache is unreachable the notification goes out rather than being lost.
+    """
+    try:
+        return cache.add(_dedup_key(event, booking_id), 1, settings.TASK_DEDUP_TTL)
+    except RedisError as e:
+        logger.warning(f"Dedup check unavailable for {event} {booking_id}: {str(e)}")
+        return True
+
+
+def release_notification(event, booking_id):
+    """
+    Forget a claim so a notification that failed to send can be queued again
+    """
+    try:
+        cache.delete(_dedup_key(event, booking_id))
+    except RedisError as e:
+        logger.warning(f"Could not release dedup key for {event} {booking_id}: {str(e)}")
+
+
+def _confirmation_message(booking, to_email=None, connection=None):
+    # If a custom email is provided, use it. Otherwise, fallback to booking.user.email
+    recipient = [to_email] if to_email else [booking.user.email]
+    return EmailMessage(
+        subject=f"Payment Confirmation for Booking #{booking.id}",
+        body=f"Dear {booking.user.username}, your booking is confirmed.",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=recipient,
+        connection=connection,
+    )
 
 
 @shared_task
 def send_payment_confirmation_email(booking_id, to_email=None):
     try:
-        booking = Booking.objects.get(id=booking_id)
-        subject = f"Payment Confirmation for Booking #{booking.id}"
-        message = f"Dear {booking.user.username}, your booking is confirmed."
-        
-        # If a custom email is provided, use it. Otherwise, fallback to booking.user.email
-        recipient = [to_email] if to_email else [booking.user.email]
-
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            recipient,
-            fail_silently=False,
-        )
+        booking = Booking.objects.select_related("user").get(id=booking_id)
+        _confirmation_message(booking, to_email).send(fail_silently=False)
+    except (smtplib.SMTPException, OSError):
+        release_notification(CONFIRMATION_EVENT, booking_id)
+        raise
     except Booking.DoesNotExist:
         return f"Booking {booking_id} not found"
+
+
+# ---------------------------------------------
+# Batched confirmation emails
+# ---------------------------------------------
+def queue_payment_confirmation(booking_id, to_email=None):
+    """
+    Queue a confirmation email, at most once per booking (see claim_notification).
+    Returns False when the confirmation was already queued.
+
+    With EMAIL_BATCH_ENABLED and Redis available the email is appended to a
+    Redis list instead of becoming its own task; every EMAIL_BATCH_SIZE-th
+    message triggers a flush, and celery beat flushes the rest every
+    EMAIL_BATCH_WINDOW seconds. Otherwise it falls back to one task per email.
+    """
+    if not claim_notification(CONFIRMATION_EVENT, booking_id):
+        logger.info(f"Confirmation for booking {booking_id} already queued; skipped")
+        return False
+
+    client = get_redis() if settings.EMAIL_BATCH_ENABLED else None
+    if client is not None:
+        item = json.dumps({"booking_id": booking_id, "to_email": to_email, "attempts": 0})
+        try:
+            length = client.rpush(EMAIL_QUEUE_KEY, item)
+        except RedisError as e:
+            logger.warning(f"Email batch queue unavailable, sending directly: {str(e)}")
+        else:
+            if length % settings.EMAIL_BATCH_SIZE == 0:
+                try:
+                    flush_confirmation_emails.delay()
+                except Exception as e:
+                    # The email is safely queued; beat flushes it on schedule
+                    logger.warning(f"Could not trigger an early email flush: {str(e)}")
+            return True
+
+    try:
+        send_payment_confirmation_email.delay(booking_id, to_email)
+    except Exception:
+        # Not published, so a retry must be allowed through
+        release_notification(CONFIRMATION_EVENT, booking_id)
+        raise
+    return True
+
+
+def send_confirmation_batch(items):
+    """
+    Send one batch of queued confirmations over a single SMTP connection.
+
+    Bookings and their users are loaded in one query. Each message is sent
+    on its own so a rejected recipient fails alone; the items that failed
+    are returned for a retry. Missing bookings are dropped.
+    """
+    bookings = Booking.objects.select_related("user").in_bulk([item["booking_id"] for item in items])
+    failed = []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except (smtplib.SMTPException, OSError) as e:
+        logger.error(f"Could not open SMTP connection: {str(e)}")
+        return list(items)
+
+    try:
+        for position, item in enumerate(items):
+            booking = bookings.get(item["booking_id"])
+            if booking is None:
+                logger.warning(f"Booking {item['booking_id']} not found; confirmation dropped")
+                continue
+            try:
+                connection.send_messages([_confirmation_message(booking, item.get("to_email"), connection)])
+            except (smtplib.SMTPException, OSError) as e:
+                logger.error(f"Confirmation for booking {booking.id} failed: {str(e)}")
+                failed.append(item)
+                if isinstance(e, (smtplib.SMTPServerDisconnected, OSError)):
+                    # The session is gone; reconnect once for the rest of the batch
+                    connection.close()
+                    try:
+                        connection.open()
+                    except (smtplib.SMTPException, OSError):
+                        failed.extend(items[position + 1:])
+                        break
+    finally:
+        connection.close()
+    return failed
+
+
+def _claim_email_batch(client, batch_size):
+    """
+    Move up to batch_size queued items to a new processing list and return
+    (processing key, raw items). The items stay in Redis until the batch
+    is finished, so a flush that dies mid-send loses nothing.
+    """
+    processing = f"{EMAIL_PROCESSING_KEY}:{uuid.uuid4().hex}"
+    # Registered first, so a crash right after the move still leaves it findable
+    client.zadd(EMAIL_PROCESSING_KEY, {processing: time.time()})
+    # One MULTI: concurrent flushers never take the same items
+    pipe = client.pipeline()
+    for _ in range(batch_size):
+        pipe.lmove(EMAIL_QUEUE_KEY, processing, "LEFT", "RIGHT")
+    raw = [entry for entry in pipe.execute() if entry is not None]
+    if not raw:
+        client.zrem(EMAIL_PROCESSING_KEY, processing)
+    return processing, raw
+
+
+def _requeue_stale_email_batches(client):
+    """
+    Put back the batches of flushes that died before finishing them (claimed
+    more than EMAIL_BATCH_PROCESSING_TIMEOUT seconds ago). Returns the
+    number of items re-queued; they may be sent a second time.
+    """
+    requeued = 0
+    stale_before = time.time() - settings.EMAIL_BATCH_PROCESSING_TIMEOUT
+    for processing in client.zrangebyscore(EMAIL_PROCESSING_KEY, "-inf", stale_before):
+        # Tail to head of the queue keeps their order, ahead of newer items
+        while client.lmove(processing, EMAIL_QUEUE_KEY, "RIGHT", "LEFT") is not None:
+            requeued += 1
+        client.zrem(EMAIL_PROCESSING_KEY, processing)
+    if requeued:
+        logger.warning(f"Re-queued {requeued} confirmation emails from unfinished flushes")
+    return requeued
+
+
+@shared_task
+def flush_confirmation_emails(batch_size=None, max_batches=20):
+    """
+    Drain the confirmation queue in batches of batch_size.
+
+    A batch is moved to a processing list before it is sent and removed
+    only once send_confirmation_batch has returned; failures go back to the
+    queue in the same transaction. Batches left behind by a flush that died
+    are re-queued by a later flush, so delivery is at least once.
+    """
+    client = get_redis()
+    if client is None:
+        return {"sent": 0, "failed": 0}
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    totals = {"sent": 0, "failed": 0}
+    _requeue_stale_email_batches(client)
+
+    for _ in range(max_batches):
+        processing, raw = _claim_email_batch(client, batch_size)
+        if not raw:
+            break
+
+        items = [json.loads(entry) for entry in raw]
+        failed = send_confirmation_batch(items)
+        totals["sent"] += len(items) - len(failed)
+        totals["failed"] += len(failed)
+
+        retry = []
+        for item in failed:
+            item["attempts"] += 1
+            if item["attempts"] < settings.EMAIL_BATCH_MAX_ATTEMPTS:
+                retry.append(json.dumps(item))
+            else:
+                logger.error(f"Giving up on confirmation for booking {item['booking_id']}")
+                release_notification(CONFIRMATION_EVENT, item["booking_id"])
+        pipe = client.pipeline()
+        if retry:
+            # Back of the queue: the next scheduled flush tries them again
+            pipe.rpush(EMAIL_QUEUE_KEY, *retry)
+        pipe.delete(processing)
+        pipe.zrem(EMAIL_PROCESSING_KEY, processing)
+        pipe.execute()
+        if len(failed) == len(items):
+            # SMTP is down; stop instead of cycling the same items
+            break
+
+    return totals
+
+
+# Chapa verify result (data.status) -> Payment.payment_status; anything else stays Pending
+RECONCILE_STATUS_MAP = {
+    "success": "Completed",
+    "failed": "Failed",
+    "cancelled": "Failed",
+}
+
+
+def _reconciled_status(response_data):
+    if response_data.get("status") != "success":
+        return None
+    data = response_data.get("data") or {}
+    return RECONCILE_STATUS_MAP.get(str(data.get("status") or "").lower())
+
+
+@shared_task
+def reconcile_pending_payments(chunk_size=None, max_workers=None, max_rps=None, min_age_seconds=None):
+    """
+    Verify Pending payments against Chapa and apply the results in bulk.
+
+    Pending rows older than min_age_seconds are read in id-ordered chunks.
+    Each chunk is verified on a thread pool that shares one keep-alive
+    client, with calls capped at max_rps per second. Status changes are
+    written with one bulk_update per chunk, and rows the webhook settled
+    in the meantime are skipped.
+    """
+    chunk_size = chunk_size or settings.CHAPA_RECONCILE_CHUNK_SIZE
+    max_workers = max_workers or settings.CHAPA_RECONCILE_CONCURRENCY
+    max_rps = settings.CHAPA_RECONCILE_MAX_RPS if max_rps is None else max_rps
+    min_age_seconds = settings.CHAPA_RECONCILE_MIN_AGE if min_age_seconds is None else min_age_seconds
+    # Imported here so mail workers never load requests/urllib3
+    from .utils.chapa import ChapaClient, RateLimiter, verify_payment
+
+    pending = (
+        Payment.objects.filter(
+            payment_status="Pending",
+            transaction_id__isnull=False,
+            created_at__lt=timezone.now() - timedelta(seconds=min_age_seconds),
+        )
+        .exclude(transaction_id="")
+        .only("id", "transaction_id", "booking_id", "payment_status", "amount")
+        .order_by("id")
+    )
+
+    limiter = RateLimiter(max_rps)
+    client = ChapaClient(pool_size=max_workers)
+    totals = {"checked": 0, "Completed": 0, "Failed": 0}
+
+    def check(payment):
+        limiter.acquire()
+        return payment, _reconciled_status(verify_payment(payment.transaction_id, client=client))
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            last_id = 0
+            while True:
+                chunk = list(pending.filter(id__gt=last_id)[:chunk_size])
+                if not chunk:
+                    break
+                last_id = chunk[-1].id
+                totals["checked"] += len(chunk)
+
+                changed = []
+                for payment, new_status in pool.map(check, chunk):
+                    if new_status:
+                        payment.payment_status = new_status
+                        changed.append(payment)
+                if not changed:
+                    continue
+
+                with transaction.atomic():
+                    still_pending = set(
+                        Payment.objects.select_for_update()
+                        .filter(id__in=[payment.id for payment in changed], payment_status="Pending")
+                        .values_list("id", flat=True)
+                    )
+                    changed = [payment for payment in changed if payment.id in still_pending]
+                    Payment.objects.bulk_update(changed, ["payment_status"])
+
+                    # bulk_update sends no signals: add the newly completed revenue to the monthly rollup
+                    revenue = defaultdict(Decimal)
+                    for payment in changed:
+                        if payment.payment_status == "Completed" and payment.booking_id:
+                            revenue[payment.booking_id] += payment.amount
+                    delta = StatsDelta()
+                    delta.add_booking_revenue(revenue)
+                    delta.apply()
+
+                    record_payment_confirmations(
+                        *[p.booking_id for p in changed if p.payment_status == "Completed" and p.booking_id]
+                    )
+
+                for payment in changed:
+                    totals[payment.payment_status] += 1
+    finally:
+        client.close()
+
+    logger.info(f"Reconciled pending payments: {totals}")
+    return totals
+
+
+# ---------------------------------------------
+# Transactional outbox
+# ---------------------------------------------
+def record_payment_confirmations(*booking_ids):
+    """
+    Record confirmation emails in the outbox. Call inside the transaction
+    that changes the payment: nothing is sent if it rolls back, and once it
+    commits a dispatch_outbox run is enqueued to publish the rows.
+    """
+    OutboxMessage.objects.bulk_create(
+        [OutboxMessage(event=CONFIRMATION_EVENT, payload={"booking_id": booking_id}) for booking_id in booking_ids]
+    )
+    transaction.on_commit(_trigger_outbox_dispatch)
+
+
+def _trigger_outbox_dispatch():
+    try:
+        dispatch_outbox.delay()
+    except Exception as e:
+        # The rows are committed; the beat sweep publishes them
+        logger.warning(f"Could not trigger an outbox dispatch: {str(e)}")
+
+
+# Outbox event -> function that hands it to Celery
+OUTBOX_HANDLERS = {
+    CONFIRMATION_EVENT: queue_payment_confirmation,
+}
+
+# Publishing failed because the broker (or the network) is unavailable, not because of the row
+BROKER_ERRORS = (KombuOperationalError, OSError)
+
+
+@shared_task
+def dispatch_outbox(batch_size=None, max_batches=20):
+    """
+    Publish committed outbox rows in id order and delete them.
+
+    Each batch is claimed in a short transaction: rows are locked with SKIP
+    LOCKED, leased for OUTBOX_LEASE_TIMEOUT seconds and committed, so no
+    transaction or row lock is held while publishing and overlapping runs
+    split the work instead of sending twice. A dispatcher that dies leaves
+    its rows to be retried once the lease runs out.
+
+    A broker or connection error keeps the row in place with the error
+    recorded and ends the run (the next row would fail the same way). Any
+    other error is recorded and the run moves on; after OUTBOX_MAX_ATTEMPTS
+    such failures the row is parked (parked_at set) and no longer
+    dispatched, so it cannot hold up the rows behind it. Clear parked_at to
+    retry it. Delivery is at-least-once; handlers deduplicate.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    dispatched, last_id = 0, 0
+
+    for _ in range(max_batches):
+        rows = _claim_outbox_batch(last_id, batch_size)
+        if not rows:
+            break
+
+        done, failed, unsent, broker_down = [], [], [], False
+        for position, row in enumerate(rows):
+            try:
+                handler = OUTBOX_HANDLERS.get(row.event)
+                if handler is None:
+                    raise LookupError(f"No handler for outbox event {row.event!r}")
+                handler(**row.payload)
+            except BROKER_ERRORS as e:
+                row.attempts += 1
+                row.last_error = str(e)
+                failed.append(row)
+                unsent = [other.id for other in rows[position + 1:]]
+                broker_down = True
+                break
+            except Exception as e:
+                row.attempts += 1
+                row.last_error = str(e)
+                if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    row.parked_at = timezone.now()
+                failed.append(row)
+            else:
+                done.append(row.id)
+        # Seeks past failed rows, so each run tries every row at most once
+        last_id = rows[-1].id
+
+        OutboxMessage.objects.filter(id__in=done).delete()
+        # Give up the lease on rows that were not published, so the next run retries them
+        OutboxMessage.objects.filter(id__in=unsent).update(leased_until=None)
+        for row in failed:
+            row.leased_until = None
+            row.save(update_fields=["attempts", "last_error", "parked_at", "leased_until"])
+            parked = " (parked)" if row.parked_at else ""
+            logger.error(f"Outbox dispatch failed for {row.event} #{row.id}{parked}: {row.last_error}")
+        dispatched += len(done)
+        if broker_down or len(rows) < batch_size:
+            break
+
+    return dispatched
+
+
+def _claim_outbox_batch(last_id, batch_size):
+    """
+    Lease the next batch_size dispatchable rows after last_id and commit
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(Q(leased_until__isnull=True) | Q(leased_until__lt=now), parked_at__isnull=True, id__gt=last_id)
+            .order_by("id")[:batch_size]
+        )
+        OutboxMessage.objects.filter(id__in=[row.id for row in rows]).update(
+            leased_until=now + timedelta(seconds=settings.OUTBOX_LEASE_TIMEOUT)
+        )
+    return rows
+
+
+@shared_task
+def purge_idempotency_keys(max_age_seconds=None):
+    """
+    Delete stored Idempotency-Key results older than IDEMPOTENCY_KEY_TTL
+    """
+    max_age_seconds = max_age_seconds or settings.IDEMPOTENCY_KEY_TTL
+    deleted, _ = IdempotencyKey.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=max_age_seconds)
+    ).delete()
+    return deleted
@@ -1,3 +1,1331 @@
-from django.test import TestCase
+import json
+import smtplib
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from alx_travel_app.celery import app as celery_app
+from . import cache as listing_cache, metrics
+from .authentication import user_cache, user_key
+from .analytics import rebuild_listing_stats
+from .models import (
+    Listing, Booking, Review, Payment, ChapaWebhookEvent, OutboxMessage, IdempotencyKey, ListingMonthlyStats,
+)
+from .tasks import (
+    EMAIL_PROCESSING_KEY,
+    EMAIL_QUEUE_KEY,
+    dispatch_outbox,
+    flush_confirmation_emails,
+    purge_idempotency_keys,
+    queue_payment_confirmation,
+    reconcile_pending_payments,
+    send_confirmation_batch,
+    send_payment_confirmation_email,
+)
+from .utils.chapa import ChapaClient, sign_webhook
+from .utils.redis import get_redis
+from .views import BookingConflict, save_without_overlap
+from .utils.chapa_stub import ChapaStubServer
+
+
+User = get_user_model()
+
+
+# ---------------------------------------------
+# Query budget harness
+# ---------------------------------------------
+class QueryBudgetMixin:
+    """
+    Assertions that fail a test when a block or endpoint issues more SQL
+    queries than its budget. Use assertEndpointWithinBudget to check that
+    the count stays fixed across page sizes, which is what catches N+1s.
+    """
+    page_sizes = (1, 10, 50)
+
+    @contextmanager
+    def assertQueryBudget(self, budget, label=""):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                f"{index}. {query['sql']}" for index, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f"{label or 'Block'} ran {executed} queries, budget is {budget}:\n{queries}")
+
+    def assertEndpointWithinBudget(self, url, budget, client=None):
+        client = client or self.client
+        separator = "&" if "?" in url else "?"
+        for page_size in self.page_sizes:
+            paged_url = f"{url}{separator}page_size={page_size}"
+            with self.assertQueryBudget(budget, label=f"GET {paged_url}"):
+                response = client.get(paged_url)
+            self.assertEqual(response.status_code, 200, paged_url)
+
+
+# ---------------------------------------------
+# Listings endpoints stay within a fixed query budget
+# ---------------------------------------------
+class EndpointQueryBudgetTests(QueryBudgetMixin, TestCase):
+    # Budgets include the conditional-GET aggregate that precedes each body
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="budget", email="budget@example.com", password="pass1234")
+        guests = [
+            User.objects.create_user(username=f"guest{i}", email=f"guest{i}@example.com") for i in range(5)
+        ]
+        cls.listings = [
+            Listing.objects.create(
+                title=f"Property {i}", description="", location="City", price_per_night=100 + i
+            )
+            for i in range(60)
+        ]
+        start = date(2030, 1, 1)
+        cls.bookings = [
+            Booking.objects.create(
+                user=guests[i % len(guests)],
+                property=listing,
+                check_in=start + timedelta(days=i),
+                check_out=start + timedelta(days=i + 2),
+            )
+            for i, listing in enumerate(cls.listings)
+        ]
+        for i, listing in enumerate(cls.listings):
+            Review.objects.create(user=guests[i % len(guests)], property=listing, rating=1 + i % 5)
+        for i, booking in enumerate(cls.bookings):
+            Payment.objects.create(
+                user=booking.user,
+                booking_reference=f"booking_{booking.id}_{i}",
+                amount=100,
+                payment_status="Completed",
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_listing_list(self):
+        self.assertEndpointWithinBudget("/api/listings/", 2, client=self.api)
+
+    def test_listing_availability_search(self):
+        self.assertEndpointWithinBudget("/api/listings/?check_in=2030-01-10&check_out=2030-01-12", 2, client=self.api)
+
+    def test_listing_detail(self):
+        with self.assertQueryBudget(2):
+            response = self.api.get(f"/api/listings/{self.listings[0].id}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_booking_list(self):
+        self.assertEndpointWithinBudget("/api/bookings/", 2, client=self.api)
+
+    def test_booking_detail(self):
+        with self.assertQueryBudget(2):
+            response = self.api.get(f"/api/bookings/{self.bookings[0].id}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_verified_payments(self):
+        self.assertEndpointWithinBudget("/api/payments/verified/", 1, client=self.api)
+
+    def test_review_list(self):
+        self.assertEndpointWithinBudget("/api/reviews/", 1, client=self.api)
+
+    def test_listing_rating_sort(self):
+        self.assertEndpointWithinBudget("/api/listings/?ordering=rating", 2, client=self.api)
+
+
+# ---------------------------------------------
+# Availability search
+# ---------------------------------------------
+class AvailabilitySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = guest = User.objects.create_user(username="searcher", email="searcher@example.com")
+        cls.free, cls.overlapped, cls.adjacent = (
+            Listing.objects.create(title=title, description="", location="City", price_per_night=80)
+            for title in ("Free", "Overlapped", "Adjacent")
+        )
+        Booking.objects.create(user=guest, property=cls.overlapped, check_in=date(2030, 5, 8),
+                               check_out=date(2030, 5, 11))
+        # Back to back with the search on both sides
+        Booking.objects.create(user=guest, property=cls.adjacent, check_in=date(2030, 5, 1),
+                               check_out=date(2030, 5, 10))
+        Booking.objects.create(user=guest, property=cls.adjacent, check_in=date(2030, 5, 12),
+                               check_out=date(2030, 5, 20))
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.guest)
+
+    def search(self, **params):
+        return self.api.get("/api/listings/", params)
+
+    def test_overlapping_listings_are_excluded_and_back_to_back_allowed(self):
+        response = self.search(check_in="2030-05-10", check_out="2030-05-12")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(row["id"] for row in response.json()["results"]),
+                         sorted([self.free.id, self.adjacent.id]))
+
+    def test_incomplete_or_empty_range_is_rejected(self):
+        self.assertEqual(self.search(check_in="2030-05-10").status_code, 400)
+        self.assertEqual(self.search(check_in="2030-05-10", check_out="2030-05-10").status_code, 400)
+
+
+# ---------------------------------------------
+# Keyset cursors
+# ---------------------------------------------
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="pager", email="pager@example.com")
+        listing = Listing.objects.create(title="Paged", description="", location="City", price_per_night=60)
+        for i in range(7):
+            booking = Booking.objects.create(
+                user=cls.user, property=listing, check_in=date(2030, 3, 1 + i * 2), check_out=date(2030, 3, 2 + i * 2)
+            )
+            Payment.objects.create(user=cls.user, booking=booking, booking_reference=f"page-{i}", amount=60,
+                                   payment_status="Completed")
+        # Most rows share a timestamp, so the id tie-breaker decides their order
+        tied = timezone.make_aware(datetime(2025, 6, 1, 12))
+        for model in (Booking, Payment):
+            model.objects.filter(id__in=list(model.objects.order_by("id").values_list("id", flat=True)[:5])) \
+                .update(created_at=tied)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row["id"] for row in response.json()["results"]]
+            url, pages = response.json()["next"], pages + 1
+        return ids, pages
+
+    def test_pages_follow_created_at_then_id(self):
+        for url, model in (("/api/bookings/?page_size=2", Booking), ("/api/payments/verified/?page_size=2", Payment)):
+            ids, pages = self.walk(url)
+            self.assertEqual(ids, list(model.objects.order_by("-created_at", "-id").values_list("id", flat=True)))
+            self.assertEqual(pages, 4)
+
+    def test_invalid_cursors_are_not_found(self):
+        cursors = [
+            "WyJ4IiwieSJd",       # ["x", "y"]
+            "W251bGwsIDFd",       # [null, 1]
+            "WyIyMDI1LTA2LTAxVDEyOjAwOjAwKzAwOjAwIiwgeyJhIjogMX1d",  # [timestamp, {"a": 1}]
+            "WzFd",               # [1]: wrong length
+            "not base64!",
+        ]
+        for cursor in cursors:
+            for url in ("/api/bookings/", "/api/payments/verified/"):
+                self.assertEqual(self.api.get(url, {"cursor": cursor}).status_code, 404, (url, cursor))
+        response = self.api.get("/api/listings/", {"ordering": "rating", "cursor": "WyJ4IiwieSJd"})
+        self.assertEqual(response.status_code, 404)
+
+
+# ---------------------------------------------
+# Listing response cache
+# ---------------------------------------------
+class ListingCacheTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", email="reader@example.com")
+        cls.listing = Listing.objects.create(title="Cached", description="", location="City", price_per_night=80)
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_repeat_reads_only_run_the_etag_aggregate(self):
+        for url in ("/api/listings/", f"/api/listings/{self.listing.id}/"):
+            first = self.api.get(url)
+            with self.assertQueryBudget(1, label=f"cached GET {url}"):
+                second = self.api.get(url)
+            self.assertEqual(first.json(), second.json())
+
+    def test_save_invalidates_detail_and_lists(self):
+        self.api.get("/api/listings/")
+        self.api.get(f"/api/listings/{self.listing.id}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing.title = "Renamed"
+            self.listing.save()
+
+        self.assertEqual(self.api.get(f"/api/listings/{self.listing.id}/").json()["title"], "Renamed")
+        self.assertEqual(self.api.get("/api/listings/").json()["results"][0]["title"], "Renamed")
+
+    def test_cache_outage_serves_uncached(self):
+        outage = RedisConnectionError("Connection refused")
+        with mock.patch.multiple(cache, get=mock.Mock(side_effect=outage), add=mock.Mock(side_effect=outage),
+                                 incr=mock.Mock(side_effect=outage), delete=mock.Mock(side_effect=outage)):
+            for url in ("/api/listings/", f"/api/listings/{self.listing.id}/"):
+                self.assertEqual(self.api.get(url).status_code, 200)
+            # Invalidation on commit is logged, not raised out of save()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.listing.title = "Renamed"
+                self.listing.save()
+        stats = listing_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (0, 0))
+
+
+# ---------------------------------------------
+# Bulk booking creation
+# ---------------------------------------------
+class BulkBookingTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="agency", email="agency@example.com")
+        cls.listings = [
+            Listing.objects.create(title=f"Bulk {i}", description="", location="City", price_per_night=70)
+            for i in range(100)
+        ]
+        Booking.objects.create(
+            user=cls.user, property=cls.listings[0], check_in=date(2030, 5, 10), check_out=date(2030, 5, 15)
+        )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def rows(self, count, start=date(2030, 6, 1)):
+        return [
+            {"property": listing.id, "check_in": str(start), "check_out": str(start + timedelta(days=3))}
+            for listing in self.listings[:count]
+        ]
+
+    def test_valid_batch_is_inserted_with_fixed_query_count(self):
+        for count in (5, 100):
+            Booking.objects.filter(check_in=date(2030, 6, 1)).delete()
+            # Includes the one upsert of the monthly stats rollup
+            with self.assertQueryBudget(9, label=f"bulk create of {count}"):
+                response = self.api.post("/api/bookings/bulk/", self.rows(count), format="json")
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(response.json()["created"], count)
+            self.assertEqual(Booking.objects.filter(check_in=date(2030, 6, 1)).count(), count)
+
+    def test_invalid_rows_are_reported_per_row_and_nothing_is_saved(self):
+        rows = self.rows(2) + [
+            {"property": self.listings[1].id, "check_in": "2030-06-02", "check_out": "2030-06-05"},
+            {"property": self.listings[0].id, "check_in": "2030-05-12", "check_out": "2030-05-13"},
+            {"property": 999999, "check_in": "2030-06-01", "check_out": "2030-06-02"},
+            {"property": self.listings[3].id, "check_in": "2030-06-05", "check_out": "2030-06-01"},
+        ]
+        response = self.api.post("/api/bookings/bulk/", {"bookings": rows}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["bookings"]
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1], {})
+        self.assertIn("Overlaps row 1", errors[2]["non_field_errors"][0])
+        self.assertIn("existing booking", errors[3]["non_field_errors"][0])
+        self.assertIn("property", errors[4])
+        self.assertIn("non_field_errors", errors[5])
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+# ---------------------------------------------
+# Overlapping bookings
+# ---------------------------------------------
+class BookingConflictTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="racer", email="racer@example.com")
+        cls.listing = Listing.objects.create(title="Popular", description="", location="City", price_per_night=90)
+        Booking.objects.create(user=cls.user, property=cls.listing, check_in=date(2030, 3, 10),
+                               check_out=date(2030, 3, 15))
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def book(self, check_in, check_out):
+        return self.api.post("/api/bookings/", {
+            "user": self.user.id, "property": self.listing.id, "check_in": check_in, "check_out": check_out,
+        }, format="json")
+
+    def test_overlap_is_409_and_back_to_back_is_allowed(self):
+        self.assertEqual(self.book("2030-03-14", "2030-03-16").status_code, 409)
+        self.assertEqual(self.book("2030-03-15", "2030-03-17").status_code, 201)
+
+    def test_save_without_overlap_maps_only_the_overlap_constraint(self):
+        def save(message):
+            def fail():
+                raise IntegrityError(message)
+            return fail
+
+        with self.assertRaises(BookingConflict) as caught:
+            save_without_overlap(save('conflicting key value violates exclusion constraint "booking_no_overlap"'))
+        self.assertEqual(caught.exception.status_code, 409)
+        with self.assertRaises(IntegrityError):
+            save_without_overlap(save('violates check constraint "booking_dates_ordered"'))
+        self.assertEqual(save_without_overlap(lambda: "saved"), "saved")
+
+    def test_constraint_violation_from_a_race_maps_to_409(self):
+        # What PostgreSQL raises when a concurrent insert wins between the check and the save
+        error = IntegrityError('conflicting key value violates exclusion constraint "booking_no_overlap"')
+        with mock.patch("alx_travel_app.listings.serializers.BookingSerializer.save", side_effect=error):
+            response = self.book("2030-04-01", "2030-04-03")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["detail"], "The listing is already booked for some of these dates.")
+
+    def test_overlap_constraint_is_only_emitted_on_postgresql(self):
+        # Table remakes (most ALTERs on SQLite) rebuild the table from the model's constraints
+        editor = connection.schema_editor(collect_sql=True)
+        table_sql, _ = editor.table_sql(Booking)
+        self.assertIn("booking_dates_ordered", table_sql)
+        self.assertEqual("EXCLUDE" in table_sql, connection.vendor == "postgresql")
+
+
+# ---------------------------------------------
+# Denormalized listing ratings
+# ---------------------------------------------
+class ListingRatingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="critic", email="critic@example.com")
+        cls.first = Listing.objects.create(title="First", description="", location="City", price_per_night=50)
+        cls.second = Listing.objects.create(title="Second", description="", location="City", price_per_night=50)
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def counters(self, listing):
+        listing.refresh_from_db()
+        return listing.review_count, listing.rating_sum
+
+    def test_counters_follow_create_edit_move_and_delete(self):
+        payload = {"user": self.user.id, "property": self.first.id, "rating": 4, "comment": ""}
+        review_id = self.api.post("/api/reviews/", payload, format="json").json()["id"]
+        self.api.post("/api/reviews/", {**payload, "rating": 2}, format="json")
+        self.assertEqual(self.counters(self.first), (2, 6))
+
+        self.api.patch(f"/api/reviews/{review_id}/", {"rating": 5}, format="json")
+        self.assertEqual(self.counters(self.first), (2, 7))
+
+        self.api.patch(f"/api/reviews/{review_id}/", {"property": self.second.id}, format="json")
+        self.assertEqual(self.counters(self.first), (1, 2))
+        self.assertEqual(self.counters(self.second), (1, 5))
+
+        self.api.delete(f"/api/reviews/{review_id}/")
+        self.assertEqual(self.counters(self.second), (0, 0))
+        self.assertEqual(self.api.get(f"/api/listings/{self.first.id}/").json()["average_rating"], 2.0)
+
+    def test_rating_sort_pages_by_average(self):
+        Review.objects.create(user=self.user, property=self.second, rating=5)
+        Review.objects.create(user=self.user, property=self.first, rating=3)
+        first_page = self.api.get("/api/listings/?ordering=rating&page_size=1").json()
+        second_page = self.api.get(first_page["next"]).json()
+        self.assertEqual(
+            [first_page["results"][0]["title"], second_page["results"][0]["title"]], ["Second", "First"]
+        )
+
+    def test_repair_command_recomputes_drifted_counters(self):
+        Review.objects.create(user=self.user, property=self.first, rating=3)
+        Listing.objects.filter(pk=self.first.pk).update(review_count=9, rating_sum=40)
+        call_command("recompute_listing_ratings", stdout=StringIO())
+        self.assertEqual(self.counters(self.first), (1, 3))
+        self.assertEqual(self.counters(self.second), (0, 0))
+
+
+# ---------------------------------------------
+# Synthetic data generator
+# ---------------------------------------------
+class GenerateDataTests(TestCase):
+    def generate(self):
+        call_command(
+            "generate_data", listings=40, bookings_per_listing=6, users=5, seed=7,
+            start_date=date(2030, 1, 1), chunk_size=15, stdout=StringIO(),
+        )
+        return [
+            (b.property.title, b.user.username, b.check_in, b.check_out)
+            for b in Booking.objects.select_related("property", "user").order_by("id")
+        ]
+
+    def test_output_is_consistent_and_deterministic(self):
+        first = self.generate()
+        self.assertTrue(first)
+
+        stays = {}
+        for title, _, check_in, check_out in first:
+            stays.setdefault(title, []).append((check_in, check_out))
+        for dates in stays.values():
+            for (_, previous_out), (next_in, _) in zip(dates, dates[1:]):
+                self.assertLessEqual(previous_out, next_in)
+
+        for listing in Listing.objects.all():
+            ratings = list(listing.reviews.values_list("rating", flat=True))
+            self.assertEqual((listing.review_count, listing.rating_sum), (len(ratings), sum(ratings)))
+        self.assertFalse(Payment.objects.filter(booking__isnull=True).exists())
+        # The monthly rollup written alongside matches one rebuilt from the rows
+        generated = stats_snapshot()
+        self.assertTrue(generated)
+        rebuild_listing_stats()
+        self.assertEqual(stats_snapshot(), generated)
+
+        Listing.objects.all().delete()
+        self.assertEqual(self.generate(), first)
+
+
+# ---------------------------------------------
+# Endpoint benchmark suite
+# ---------------------------------------------
+class BenchEndpointsTests(TestCase):
+    def test_every_endpoint_answers_and_results_are_written(self):
+        call_command("generate_data", listings=5, users=2, seed=1, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "bench.json"
+            call_command("bench_endpoints", requests=3, warmup=1, output=str(output), stdout=StringIO())
+            results = json.loads(output.read_text())
+
+        self.assertEqual(len(results["endpoints"]), 9)
+        for name, stats in results["endpoints"].items():
+            self.assertEqual(stats["errors"], 0, name)
+            self.assertEqual(stats["count"], 3)
+        # Benchmark fixtures are rolled back
+        self.assertFalse(User.objects.filter(username="bench_api_user").exists())
+
+
+# ---------------------------------------------
+# Conditional GET
+# ---------------------------------------------
+class ConditionalGetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="poller", email="poller@example.com")
+        cls.listing = Listing.objects.create(title="Polled", description="", location="City", price_per_night=60)
+        cls.booking = Booking.objects.create(
+            user=cls.user, property=cls.listing, check_in=date(2030, 2, 1), check_out=date(2030, 2, 4)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_matching_etag_returns_304_without_serializing(self):
+        for url in ("/api/listings/", f"/api/listings/{self.listing.id}/",
+                    "/api/bookings/", f"/api/bookings/{self.booking.id}/"):
+            first = self.api.get(url)
+            self.assertTrue(first.has_header("ETag"), url)
+            self.assertTrue(first.has_header("Last-Modified"), url)
+
+            with self.assertQueryBudget(1, label=f"revalidate {url}"):
+                second = self.api.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(second.status_code, 304, url)
+            self.assertEqual(second.content, b"", url)
+
+            modified = self.api.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+            self.assertEqual(modified.status_code, 304, url)
+
+    def test_related_listing_change_refreshes_booking_etag(self):
+        first = self.api.get("/api/bookings/")
+        self.listing.title = "Renamed"
+        self.listing.save()
+        second = self.api.get("/api/bookings/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second.json()["results"][0]["property_title"], "Renamed")
+
+    def test_user_email_change_refreshes_booking_etag(self):
+        for url in ("/api/bookings/", f"/api/bookings/{self.booking.id}/"):
+            first = self.api.get(url)
+            self.user.email = f"renamed-{len(url)}@example.com"
+            self.user.save()
+            second = self.api.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(second.status_code, 200, url)
+            self.assertNotEqual(second["ETag"], first["ETag"], url)
+            body = second.json()
+            self.assertEqual((body["results"][0] if "results" in body else body)["user_email"], self.user.email)
+
+    def test_login_does_not_refresh_booking_etag(self):
+        first = self.api.get("/api/bookings/")
+        update_last_login(None, self.user)
+        self.assertEqual(self.api.get("/api/bookings/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+
+# ---------------------------------------------
+# Request metrics (Server-Timing, /metrics)
+# ---------------------------------------------
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="metrics", email="metrics@example.com")
+        Listing.objects.create(title="Timed", description="", location="City", price_per_night=50)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_server_timing_and_route_histogram(self):
+        response = self.api.get("/api/listings/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+        self.api.get("/api/listings/999999/")
+
+        with self.settings(METRICS_TOKEN="scrape-secret"):
+            body = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret").content.decode()
+        self.assertIn('http_requests_total{route="listing-list",method="GET",status="200"} 1', body)
+        self.assertIn('http_requests_total{route="listing-detail",method="GET",status="404"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{route="listing-list",method="GET",le="+Inf"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{route="listing-list",method="GET"} 1', body)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_token_is_enforced(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_metrics_without_a_token_are_only_served_in_debug(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    def test_chapa_calls_are_charged_to_the_request(self):
+        timings, token = metrics.start_request()
+        try:
+            with ChapaStubServer(latency=0.01) as stub, override_settings(CHAPA_BASE_URL=stub.base_url):
+                client = ChapaClient()
+                client.verify("tx-1")
+                client.close()
+        finally:
+            metrics.end_request(token)
+        self.assertGreaterEqual(timings.outbound["chapa"], 0.01)
+
+
+# ---------------------------------------------
+# Cached JWT user resolution
+# ---------------------------------------------
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="cached", email="cached@example.com")
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear_local()
+        token = RefreshToken.for_user(self.user).access_token
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def _user_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.api.get("/api/bookings/").status_code, 200)
+        return [q["sql"] for q in context.captured_queries if 'FROM "auth_user"' in q["sql"]]
+
+    def test_user_is_loaded_once(self):
+        self.assertEqual(len(self._user_queries()), 1)
+        self.assertEqual(self._user_queries(), [])
+        # Other processes find it in the shared cache
+        user_cache.clear_local()
+        self.assertEqual(self._user_queries(), [])
+
+    def test_saving_the_user_invalidates_the_cache(self):
+        self._user_queries()
+        self.user.first_name = "Renamed"
+        self.user.save()
+        self.assertEqual(len(self._user_queries()), 1)
+
+    def test_deactivated_user_is_rejected(self):
+        self._user_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.api.get("/api/bookings/").status_code, 401)
+
+    def test_unauthenticated_requests_are_challenged_for_a_bearer_token(self):
+        response = APIClient().get("/api/bookings/")
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(response["WWW-Authenticate"].startswith("Bearer"))
+
+    def test_cached_entry_holds_no_password(self):
+        self._user_queries()
+        data = cache.get(user_key(self.user.id))
+        self.assertEqual(data["email"], "cached@example.com")
+        self.assertNotIn("password", data)
+        self.assertNotIn(self.user.password, data.values())
+
+    def test_cache_outage_falls_back_to_the_database(self):
+        outage = RedisConnectionError("Connection refused")
+        with mock.patch.object(cache, "get", side_effect=outage), \
+                mock.patch.object(cache, "set", side_effect=outage), \
+                mock.patch.object(cache, "delete", side_effect=outage):
+            user_cache.clear_local()
+            self.assertEqual(len(self._user_queries()), 1)
+            self.user.first_name = "Renamed"
+            self.user.save()
+            user_cache.clear_local()
+            self.assertEqual(len(self._user_queries()), 1)
+
+
+# ---------------------------------------------
+# Batched confirmation emails
+# ---------------------------------------------
+class ConfirmationEmailBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        listing = Listing.objects.create(title="Mail", description="", location="City", price_per_night=50)
+        cls.bookings = []
+        for i in range(3):
+            user = User.objects.create_user(username=f"guest{i}", email=f"guest{i}@example.com")
+            cls.bookings.append(Booking.objects.create(
+                user=user, property=listing, check_in=date(2030, 1, 1 + i * 2), check_out=date(2030, 1, 2 + i * 2)
+            ))
+
+    def setUp(self):
+        cache.clear()
+
+    def items(self):
+        return [{"booking_id": booking.id, "to_email": None, "attempts": 0} for booking in self.bookings]
+
+    def test_batch_loads_bookings_in_one_query(self):
+        items = self.items() + [{"booking_id": 999999, "to_email": None, "attempts": 0}]
+        with self.assertNumQueries(1):
+            failed = send_confirmation_batch(items)
+        self.assertEqual(failed, [])
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["guest0@example.com", "guest1@example.com",
+                                                               "guest2@example.com"])
+
+    def test_rejected_message_fails_alone(self):
+        original = LocmemEmailBackend.send_messages
+
+        def send_messages(backend, messages):
+            if messages[0].to == ["guest1@example.com"]:
+                raise smtplib.SMTPRecipientsRefused({"guest1@example.com": (550, b"No such user")})
+            return original(backend, messages)
+
+        with mock.patch.object(LocmemEmailBackend, "send_messages", send_messages):
+            failed = send_confirmation_batch(self.items())
+        self.assertEqual([item["booking_id"] for item in failed], [self.bookings[1].id])
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(EMAIL_BATCH_ENABLED=True)
+    def test_without_redis_falls_back_to_one_task_per_email(self):
+        with mock.patch("alx_travel_app.listings.tasks.get_redis", return_value=None), \
+                mock.patch.object(send_payment_confirmation_email, "delay") as delay:
+            self.assertTrue(queue_payment_confirmation(self.bookings[0].id))
+        delay.assert_called_once_with(self.bookings[0].id, None)
+
+    @override_settings(EMAIL_BATCH_ENABLED=False)
+    def test_repeated_confirmations_for_a_booking_are_deduplicated(self):
+        with mock.patch.object(send_payment_confirmation_email, "delay") as delay:
+            self.assertTrue(queue_payment_confirmation(self.bookings[0].id))
+            self.assertFalse(queue_payment_confirmation(self.bookings[0].id))
+            self.assertTrue(queue_payment_confirmation(self.bookings[1].id))
+        self.assertEqual(delay.call_args_list, [
+            mock.call(self.bookings[0].id, None), mock.call(self.bookings[1].id, None),
+        ])
+
+    @override_settings(EMAIL_BATCH_ENABLED=False)
+    def test_unpublished_confirmation_can_be_retried(self):
+        with mock.patch.object(send_payment_confirmation_email, "delay", side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                queue_payment_confirmation(self.bookings[0].id)
+        with mock.patch.object(send_payment_confirmation_email, "delay") as delay:
+            self.assertTrue(queue_payment_confirmation(self.bookings[0].id))
+        delay.assert_called_once_with(self.bookings[0].id, None)
+
+    def test_tasks_are_routed_to_separate_queues(self):
+        router = celery_app.amqp.router
+        self.assertEqual(router.route({}, reconcile_pending_payments.name)["queue"].name, "payments")
+        self.assertEqual(router.route({}, send_payment_confirmation_email.name)["queue"].name, "mail")
+
+
+def redis_available():
+    client = get_redis()
+    try:
+        return client is not None and client.ping()
+    except RedisError:
+        return False
+
+
+@skipUnless(redis_available(), "needs the Redis server at REDIS_URL")
+@override_settings(EMAIL_BATCH_ENABLED=True)
+class ConfirmationEmailFlushTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        listing = Listing.objects.create(title="Flush", description="", location="City", price_per_night=50)
+        user = User.objects.create_user(username="flushed", email="flushed@example.com")
+        cls.bookings = [
+            Booking.objects.create(user=user, property=listing, check_in=date(2030, 2, 1 + i * 2),
+                                   check_out=date(2030, 2, 2 + i * 2))
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.redis = get_redis()
+        self.addCleanup(self.clear_queue)
+        self.clear_queue()
+        for booking in self.bookings:
+            queue_payment_confirmation(booking.id)
+
+    def clear_queue(self):
+        self.redis.delete(EMAIL_QUEUE_KEY, *self.redis.zrange(EMAIL_PROCESSING_KEY, 0, -1), EMAIL_PROCESSING_KEY)
+
+    def test_flush_sends_and_removes_the_batch(self):
+        self.assertEqual(flush_confirmation_emails(), {"sent": 3, "failed": 0})
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(self.redis.llen(EMAIL_QUEUE_KEY), 0)
+        self.assertEqual(self.redis.zcard(EMAIL_PROCESSING_KEY), 0)
+
+    def test_batch_of_a_dead_flush_is_requeued(self):
+        with mock.patch("alx_travel_app.listings.tasks.send_confirmation_batch", side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                flush_confirmation_emails()
+        # Not sent, but not lost either
+        self.assertEqual(self.redis.llen(EMAIL_QUEUE_KEY), 0)
+        self.assertEqual(self.redis.zcard(EMAIL_PROCESSING_KEY), 1)
+
+        # Still within the timeout: the batch may belong to a live flush
+        self.assertEqual(flush_confirmation_emails(), {"sent": 0, "failed": 0})
+        with override_settings(EMAIL_BATCH_PROCESSING_TIMEOUT=0):
+            self.assertEqual(flush_confirmation_emails(), {"sent": 3, "failed": 0})
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(self.redis.zcard(EMAIL_PROCESSING_KEY), 0)
+
+
+# ---------------------------------------------
+# Idempotency keys
+# ---------------------------------------------
+class IdempotencyKeyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="retrier", email="retrier@example.com")
+        listing = Listing.objects.create(title="Retry", description="", location="City", price_per_night=50)
+        cls.booking = Booking.objects.create(
+            user=cls.user, property=listing, check_in=date(2030, 1, 1), check_out=date(2030, 1, 3)
+        )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def pay(self, key, booking_id=None, **data):
+        return self.api.post(
+            f"/api/bookings/{booking_id or self.booking.id}/pay/", data, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_the_first_response(self):
+        first = self.pay("retry-1")
+        # The key lookup (inside a savepoint) is the only database work; the view does not run
+        with self.assertNumQueries(3):
+            second = self.pay("retry-1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((second.status_code, second.json()), (201, first.json()))
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.pay("retry-2")
+        self.assertEqual(self.pay("retry-2", note="changed").status_code, 422)
+
+    def test_failed_request_does_not_consume_the_key(self):
+        self.assertEqual(self.pay("retry-3", booking_id=999999).status_code, 404)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_duplicate_waits_for_an_unfinished_request(self):
+        first = self.pay("retry-7")
+        stored = IdempotencyKey.objects.values("status_code", "response_body").get()
+        # What the first request committed before calling Chapa
+        IdempotencyKey.objects.update(status_code=None, response_body=None)
+
+        def first_request_finishes(seconds):
+            IdempotencyKey.objects.update(**stored)
+
+        with mock.patch("alx_travel_app.listings.idempotency.time.sleep", side_effect=first_request_finishes):
+            second = self.pay("retry-7")
+        self.assertEqual((second.status_code, second.json()), (201, first.json()))
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_duplicate_runs_once_the_unfinished_request_fails(self):
+        self.pay("retry-8")
+        Payment.objects.all().delete()
+        IdempotencyKey.objects.update(status_code=None, response_body=None)
+
+        def first_request_fails(seconds):
+            IdempotencyKey.objects.all().delete()
+
+        with mock.patch("alx_travel_app.listings.idempotency.time.sleep", side_effect=first_request_fails):
+            self.assertEqual(self.pay("retry-8").status_code, 201)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
+
+    @override_settings(CHAPA_CONNECT_TIMEOUT=0, CHAPA_READ_TIMEOUT=0.3)
+    def test_duplicate_of_an_unfinished_request_conflicts(self):
+        self.pay("retry-5")
+        IdempotencyKey.objects.update(status_code=None, response_body=None)
+        # Still pending once the wait runs out
+        self.assertEqual(self.pay("retry-5").status_code, 409)
+        self.assertEqual(Payment.objects.count(), 1)
+
+        # Once it is stale the key is taken over and the request runs again
+        Payment.objects.all().delete()
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.pay("retry-5").status_code, 201)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
+
+    def test_view_error_releases_the_key(self):
+        with mock.patch("alx_travel_app.listings.views.record_payment_confirmations", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.pay("retry-6")
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.pay("retry-6").status_code, 201)
+
+    def test_old_keys_are_purged(self):
+        self.pay("retry-4")
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(purge_idempotency_keys(), 1)
+
+
+# ---------------------------------------------
+# Streaming exports
+# ---------------------------------------------
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="finance", email="finance@example.com", is_staff=True)
+        listing = Listing.objects.create(title="Exported, \"quoted\"", description="", location="City",
+                                         price_per_night=50)
+        for day in (1, 2, 3):
+            booking = Booking.objects.create(
+                user=cls.admin, property=listing, check_in=date(2030, 1, day * 3), check_out=date(2030, 1, day * 3 + 1)
+            )
+            payment = Payment.objects.create(
+                user=cls.admin, booking=booking, booking_reference=f"ref-{day}", amount="50.00",
+                payment_status="Completed",
+            )
+            created = timezone.make_aware(datetime(2025, 3, day, 12))
+            Payment.objects.filter(pk=payment.pk).update(created_at=created)
+            Booking.objects.filter(pk=booking.pk).update(created_at=created)
+        Payment.objects.create(user=cls.admin, booking_reference="pending", amount="10.00")
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def _body(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_payments_csv_honours_the_date_range(self):
+        response = self.api.get("/api/exports/payments/?since=2025-03-02&until=2025-03-03",
+                                HTTP_ACCEPT="text/csv")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="payments.csv"')
+        lines = self._body(response).splitlines()
+        self.assertEqual(lines[0], "id,user,user_email,booking,booking_reference,amount,transaction_id,"
+                                   "payment_status,created_at")
+        self.assertEqual([line.split(",")[4] for line in lines[1:]], ["ref-2", "ref-3"])
+
+    def test_bookings_ndjson(self):
+        response = self.api.get("/api/exports/bookings/?output=ndjson&until=2025-03-01")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self._body(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["property_title"], 'Exported, "quoted"')
+        self.assertEqual(rows[0]["check_in"], "2030-01-03")
+
+    def test_invalid_range_and_non_staff_are_rejected(self):
+        self.assertEqual(self.api.get("/api/exports/payments/?since=2025-03-02&until=2025-03-01").status_code, 400)
+        self.api.force_authenticate(User.objects.create_user(username="guest", email="guest@example.com"))
+        self.assertEqual(self.api.get("/api/exports/payments/").status_code, 403)
+
+
+# ---------------------------------------------
+# Admin changelists
+# ---------------------------------------------
+# The manifest storage needs collectstatic, which tests do not run
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class AdminChangelistTests(TestCase):
+    changelists = ("listing", "booking", "payment", "review")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="root", email="root@example.com", password="x")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _add_rows(self, n):
+        for i in range(n):
+            guest = User.objects.create_user(username=f"guest{User.objects.count()}", email="g@example.com")
+            listing = Listing.objects.create(title="Admin", description="", location="City", price_per_night=50)
+            booking = Booking.objects.create(
+                user=guest, property=listing, check_in=date(2030, 1, 1), check_out=date(2030, 1, 2)
+            )
+            Payment.objects.create(user=guest, booking=booking, booking_reference=f"adm-{booking.pk}", amount=50)
+            Review.objects.create(user=guest, property=listing, rating=4)
+
+    def _queries(self, name, query=""):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f"/admin/listings/{name}/{query}")
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self._add_rows(2)
+        before = {name: self._queries(name) for name in self.changelists}
+        self._add_rows(5)
+        self.assertEqual({name: self._queries(name) for name in self.changelists}, before)
+
+    def test_search_matches_exact_values_only(self):
+        self._add_rows(3)
+        booking = Booking.objects.select_related("user").first()
+        response = self.client.get(f"/admin/listings/booking/?q={booking.user.username}")
+        self.assertEqual(response.context["cl"].result_count, 1)
+        response = self.client.get(f"/admin/listings/booking/?q={booking.user.username[:-1]}")
+        self.assertEqual(response.context["cl"].result_count, 0)
+
+
+# ---------------------------------------------
+# Precomputed OpenAPI schema
+# ---------------------------------------------
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class OpenAPISchemaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    # Integer ranges in the schema come from the database backend; the committed file is built on PostgreSQL
+    @skipUnless(connection.vendor == "postgresql", "openapi.json is generated against PostgreSQL")
+    def test_committed_schema_is_up_to_date(self):
+        call_command("generate_openapi", "--check", stdout=StringIO())
+
+    def test_schema_is_served_with_validators(self):
+        response = self.client.get("/openapi.json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("/bookings/{id}/pay/", json.loads(response.content)["paths"])
+        self.assertIn("max-age=", response["Cache-Control"])
+
+        with mock.patch("alx_travel_app.listings.schema.generate_schema") as generate:
+            response = self.client.get("/openapi.json", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        generate.assert_not_called()
+
+    def test_swagger_ui_points_at_the_static_schema(self):
+        response = self.client.get("/swagger/")
+        self.assertContains(response, '"url": "/openapi.json"')
+
+
+# ---------------------------------------------
+# Transactional outbox
+# ---------------------------------------------
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="outbox", email="outbox@example.com")
+        listing = Listing.objects.create(title="Outbox", description="", location="City", price_per_night=50)
+        cls.booking = Booking.objects.create(
+            user=cls.user, property=listing, check_in=date(2030, 1, 1), check_out=date(2030, 1, 3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_pay_records_the_notification_without_publishing(self):
+        with mock.patch("alx_travel_app.listings.tasks.send_payment_confirmation_email.delay") as delay:
+            response = self.api.post(f"/api/bookings/{self.booking.id}/pay/")
+        self.assertEqual(response.status_code, 201)
+        delay.assert_not_called()
+        self.assertEqual(OutboxMessage.objects.get().payload, {"booking_id": self.booking.id})
+
+    def test_commit_enqueues_a_dispatch(self):
+        with mock.patch.object(dispatch_outbox, "delay") as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.api.post(f"/api/bookings/{self.booking.id}/pay/").status_code, 201)
+        delay.assert_called_once_with()
+
+    def test_rows_are_leased_while_publishing(self):
+        row = OutboxMessage.objects.create(event="payment_confirmation", payload={"booking_id": self.booking.id})
+
+        def publish(*args):
+            # Claimed and committed before the broker is called
+            self.assertIsNotNone(OutboxMessage.objects.get(pk=row.pk).leased_until)
+
+        with mock.patch("alx_travel_app.listings.tasks.send_payment_confirmation_email.delay", side_effect=publish):
+            self.assertEqual(dispatch_outbox(), 1)
+
+    def test_leased_rows_wait_for_the_lease_to_expire(self):
+        row = OutboxMessage.objects.create(event="payment_confirmation", payload={"booking_id": self.booking.id},
+                                           leased_until=timezone.now() + timedelta(minutes=1))
+        with mock.patch("alx_travel_app.listings.tasks.send_payment_confirmation_email.delay") as delay:
+            self.assertEqual(dispatch_outbox(), 0)
+            # Its dispatcher died; once the lease is over another run takes it
+            OutboxMessage.objects.filter(pk=row.pk).update(leased_until=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(dispatch_outbox(), 1)
+        delay.assert_called_once_with(self.booking.id, None)
+
+    def test_dispatch_publishes_and_deletes_rows(self):
+        OutboxMessage.objects.create(event="payment_confirmation", payload={"booking_id": self.booking.id})
+        with mock.patch("alx_travel_app.listings.tasks.send_payment_confirmation_email.delay") as delay:
+            self.assertEqual(dispatch_outbox(), 1)
+        delay.assert_called_once_with(self.booking.id, None)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_failed_publish_keeps_the_row_for_the_next_run(self):
+        OutboxMessage.objects.create(event="payment_confirmation", payload={"booking_id": self.booking.id})
+        with mock.patch(
+            "alx_travel_app.listings.tasks.send_payment_confirmation_email.delay", side_effect=OSError("broker down")
+        ):
+            self.assertEqual(dispatch_outbox(), 0)
+        row = OutboxMessage.objects.get()
+        self.assertEqual((row.attempts, row.last_error, row.leased_until), (1, "broker down", None))
+
+        # The dedup claim was released, so the retry goes out
+        with mock.patch("alx_travel_app.listings.tasks.send_payment_confirmation_email.delay") as delay:
+            self.assertEqual(dispatch_outbox(), 1)
+        delay.assert_called_once()
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_failing_row_does_not_block_later_rows_and_is_parked(self):
+        unknown = OutboxMessage.objects.create(event="no_such_event", payload={})
+        broken = OutboxMessage.objects.create(event="payment_confirmation", payload={"booking_id": "x", "bad": 1})
+        OutboxMessage.objects.create(event="payment_confirmation", payload={"booking_id": self.booking.id})
+        with mock.patch("alx_travel_app.listings.tasks.send_payment_confirmation_email.delay") as delay:
+            self.assertEqual(dispatch_outbox(batch_size=1), 1)
+        delay.assert_called_once_with(self.booking.id, None)
+        unknown.refresh_from_db()
+        self.assertEqual(unknown.attempts, 1)
+        self.assertIn("no_such_event", unknown.last_error)
+        self.assertIsNone(unknown.parked_at)
+
+        dispatch_outbox()
+        self.assertEqual(
+            sorted(OutboxMessage.objects.filter(parked_at__isnull=False).values_list("id", flat=True)),
+            [unknown.id, broken.id],
+        )
+        # Parked rows are left alone
+        dispatch_outbox()
+        self.assertEqual(OutboxMessage.objects.get(pk=unknown.pk).attempts, 2)
+
+
+# ---------------------------------------------
+# Signed Chapa webhook
+# ---------------------------------------------
+@override_settings(CHAPA_WEBHOOK_SECRET="webhook-secret")
+class ChapaWebhookTests(TestCase):
+    url = "/api/payments/webhook/chapa/"
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="hooked", email="hooked@example.com")
+        listing = Listing.objects.create(title="Hooked", description="", location="City", price_per_night=100)
+        cls.booking = Booking.objects.create(
+            user=user, property=listing, check_in=date(2030, 2, 1), check_out=date(2030, 2, 3)
+        )
+        cls.payment = Payment.objects.create(
+            user=user, booking=cls.booking, booking_reference="hooked", amount=200, transaction_id="tx-hook",
+        )
+
+    def post(self, payload, signature=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        return self.client.post(
+            self.url, body, content_type="application/json",
+            HTTP_X_CHAPA_SIGNATURE=sign_webhook(body) if signature is None else signature,
+        )
+
+    def event(self, status):
+        return {"event": f"charge.{status}", "tx_ref": "tx-hook", "status": status}
+
+    def status(self):
+        return Payment.objects.get(pk=self.payment.pk).payment_status
+
+    def test_missing_or_bad_signature_is_rejected(self):
+        body = json.dumps(self.event("success")).encode()
+        self.assertEqual(self.client.post(self.url, body, content_type="application/json").status_code, 403)
+        self.assertEqual(self.post(body, signature="0" * 64).status_code, 403)
+        self.assertEqual(self.status(), "Pending")
+        self.assertFalse(ChapaWebhookEvent.objects.exists())
+
+    def test_signed_body_that_is_not_an_object_is_rejected(self):
+        self.assertEqual(self.post(b"[1,2]").status_code, 400)
+        self.assertEqual(self.post(b"not json").status_code, 400)
+
+    def test_success_completes_the_payment_and_records_the_confirmation(self):
+        response = self.post(self.event("success"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.status(), "Completed")
+        self.assertEqual(
+            list(OutboxMessage.objects.values_list("payload", flat=True)), [{"booking_id": self.booking.id}]
+        )
+        self.assertEqual(ChapaWebhookEvent.objects.get().payment_id, self.payment.id)
+
+    def test_completed_payment_is_not_downgraded(self):
+        self.post(self.event("success"))
+        for status in ("failed", "pending"):
+            self.assertEqual(self.post(self.event(status)).status_code, 200)
+        self.assertEqual(self.status(), "Completed")
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_duplicate_event_is_recorded_once(self):
+        for _ in range(2):
+            self.assertEqual(self.post(self.event("success")).status_code, 200)
+        self.assertEqual(ChapaWebhookEvent.objects.count(), 1)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+
+# ---------------------------------------------
+# Pending payment reconciliation against a local Chapa stand-in
+# ---------------------------------------------
+class ReconcilePendingPaymentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="payer", email="payer@example.com")
+        listing = Listing.objects.create(title="Property", description="", location="City", price_per_night=100)
+        booking = Booking.objects.create(
+            user=user, property=listing, check_in=date(2030, 1, 1), check_out=date(2030, 1, 3)
+        )
+        cls.payments = {
+            outcome: Payment.objects.create(
+                user=user, booking=booking, booking_reference=f"booking_{booking.id}_{outcome}",
+                amount=200, transaction_id=f"tx-{outcome}",
+            )
+            for outcome in ("success", "failed", "pending")
+        }
+        Payment.objects.update(created_at=timezone.now() - timedelta(hours=1))
+
+    def test_statuses_applied_in_bulk(self):
+        outcomes = {f"tx-{outcome}": outcome for outcome in self.payments}
+        with ChapaStubServer(outcomes=outcomes) as stub, override_settings(CHAPA_BASE_URL=stub.base_url):
+            totals = reconcile_pending_payments(chunk_size=2, max_workers=2, max_rps=0)
+
+        self.assertEqual(stub.calls, 3)
+        self.assertEqual(totals, {"checked": 3, "Completed": 1, "Failed": 1})
+        statuses = {outcome: Payment.objects.get(pk=p.pk).payment_status for outcome, p in self.payments.items()}
+        self.assertEqual(statuses, {"success": "Completed", "failed": "Failed", "pending": "Pending"})
+        self.assertEqual(ListingMonthlyStats.objects.get().revenue, 200)
+        # The confirmation is written to the outbox in the same transaction
+        self.assertEqual(
+            list(OutboxMessage.objects.values_list("payload", flat=True)),
+            [{"booking_id": self.payments["success"].booking_id}],
+        )
+
+
+# ---------------------------------------------
+# Monthly occupancy and revenue rollups
+# ---------------------------------------------
+def stats_snapshot():
+    return {
+        (row.property_id, row.month): (row.booked_nights, row.booking_count, row.revenue)
+        for row in ListingMonthlyStats.objects.exclude(booked_nights=0, booking_count=0, revenue=0)
+    }
+
+
+class ListingMonthlyStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username="traveller", email="traveller@example.com")
+        cls.admin = User.objects.create_user(username="analyst", email="analyst@example.com", is_staff=True)
+        cls.first = Listing.objects.create(title="First", description="", location="City", price_per_night=50)
+        cls.second = Listing.objects.create(title="Second", description="", location="City", price_per_night=80)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def test_stay_across_a_month_end_is_split(self):
+        booking = Booking.objects.create(
+            user=self.guest, property=self.first, check_in=date(2030, 1, 29), check_out=date(2030, 2, 3)
+        )
+        Payment.objects.create(user=self.guest, booking=booking, booking_reference="split", amount="250.00",
+                               payment_status="Completed")
+        self.assertEqual(stats_snapshot(), {
+            (self.first.id, date(2030, 1, 1)): (3, 1, 250),
+            (self.first.id, date(2030, 2, 1)): (2, 0, 0),
+        })
+
+    def test_incremental_updates_match_a_rebuild(self):
+        moved = Booking.objects.create(
+            user=self.guest, property=self.first, check_in=date(2030, 3, 1), check_out=date(2030, 3, 4)
+        )
+        kept = Booking.objects.create(
+            user=self.guest, property=self.first, check_in=date(2030, 3, 10), check_out=date(2030, 3, 12)
+        )
+        deleted = Booking.objects.create(
+            user=self.guest, property=self.second, check_in=date(2030, 4, 1), check_out=date(2030, 4, 2)
+        )
+        payment = Payment.objects.create(user=self.guest, booking=moved, booking_reference="a", amount="150.00")
+        Payment.objects.create(user=self.guest, booking=kept, booking_reference="b", amount="100.00",
+                               payment_status="Completed")
+        Payment.objects.create(user=self.guest, booking=deleted, booking_reference="c", amount="80.00",
+                               payment_status="Completed")
+        refunded = Payment.objects.create(user=self.guest, booking=kept, booking_reference="d", amount="5.00",
+                                          payment_status="Completed")
+
+        payment.payment_status = "Completed"
+        payment.save(update_fields=["payment_status"])
+        moved.property, moved.check_in, moved.check_out = self.second, date(2030, 5, 30), date(2030, 6, 2)
+        moved.save()
+        deleted.delete()
+        refunded.delete()
+        incremental = stats_snapshot()
+
+        rebuild_listing_stats()
+        self.assertEqual(stats_snapshot(), incremental)
+        self.assertEqual(incremental, {
+            (self.first.id, date(2030, 3, 1)): (2, 1, 100),
+            (self.second.id, date(2030, 5, 1)): (2, 1, 150),
+            (self.second.id, date(2030, 6, 1)): (1, 0, 0),
+        })
+
+    def test_rebuild_command_repairs_drift(self):
+        Booking.objects.create(
+            user=self.guest, property=self.first, check_in=date(2030, 7, 1), check_out=date(2030, 7, 8)
+        )
+        ListingMonthlyStats.objects.update(booked_nights=99)
+        ListingMonthlyStats.objects.create(property=self.second, month=date(2030, 7, 1), booking_count=4)
+        call_command("rebuild_listing_stats", stdout=StringIO())
+        self.assertEqual(stats_snapshot(), {(self.first.id, date(2030, 7, 1)): (7, 1, 0)})
+
+    def test_api_filters_and_pages_in_month_order(self):
+        for listing in (self.first, self.second):
+            for month in (1, 2, 3):
+                Booking.objects.create(
+                    user=self.guest, property=listing, check_in=date(2030, month, 1), check_out=date(2030, month, 16)
+                )
+
+        first_page = self.api.get("/api/analytics/listings/monthly/?since=2030-02-14&page_size=3").json()
+        second_page = self.api.get(first_page["next"]).json()
+        rows = first_page["results"] + second_page["results"]
+        self.assertEqual([(row["month"], row["property"]) for row in rows], [
+            ("2030-02-01", self.first.id), ("2030-02-01", self.second.id),
+            ("2030-03-01", self.first.id), ("2030-03-01", self.second.id),
+        ])
+        self.assertEqual(rows[0]["occupancy"], round(15 / 28, 4))
+        self.assertIsNone(second_page["next"])
+
+        response = self.api.get(f"/api/analytics/listings/monthly/?property={self.second.id}&until=2030-01-31")
+        self.assertEqual([row["month"] for row in response.json()["results"]], ["2030-01-01"])
+
+    def test_invalid_range_and_non_staff_are_rejected(self):
+        response = self.api.get("/api/analytics/listings/monthly/?since=2030-03-01&until=2030-02-01")
+        self.assertEqual(response.status_code, 400)
+        self.api.force_authenticate(self.guest)
+        self.assertEqual(self.api.get("/api/analytics/listings/monthly/").status_code, 403)
@@ -4,14 +4,20 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ListingViewSet,
     BookingViewSet,
+    ReviewViewSet,
     VerifyPaymentView,
     VerifiedPaymentsView,
+    PaymentExportView,
+    BookingExportView,
+    ListingMonthlyStatsView,
+    ChapaWebhookView,
     test_send_email,
 )
 
 router = DefaultRouter()
 router.register(r"listings", ListingViewSet, basename="listing")
 router.register(r"bookings", BookingViewSet, basename="booking")
+router.register(r"reviews", ReviewViewSet, basename="review")
 
 urlpatterns = [
     path("", include(router.urls)),  # includes /bookings/{id}/pay/
@@ -20,9 +26,17 @@ urlpatterns = [
         VerifyPaymentView.as_view(),
         name="verify-payment",
     ),
+    path(
+        "payments/webhook/chapa/", ChapaWebhookView.as_view(), name="chapa-webhook"
+    ),
     path(
         "payments/verified/", VerifiedPaymentsView.as_view(), name="verified-payments"
     ),
+    path("exports/payments/", PaymentExportView.as_view(), name="export-payments"),
+    path("exports/bookings/", BookingExportView.as_view(), name="export-bookings"),
+    path(
+        "analytics/listings/monthly/", ListingMonthlyStatsView.as_view(), name="listing-monthly-stats"
+    ),
     path("email/test-send-email/", test_send_email),
     path("create-admin/", create_admin),
 ]
@@ -0,0 +1,43 @@
+# listings/utils/bench.py
+
+import math
+import statistics
+import time
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of a list of numbers (pct in 0-100)
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples):
+    """
+    Latency summary (milliseconds) used by all benchmark commands
+    """
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+    }
+
+
+def time_call(fn, repeat=20, warmup=3):
+    """
+    Call fn() warmup + repeat times and return the timed samples in milliseconds
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
@@ -1,16 +1,127 @@
 # listings/utils/chapa.py
 
+import hashlib
+import hmac
 import os
+import threading
+import time
+
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from alx_travel_app.listings import metrics
+
+DEFAULT_BASE_URL = "https://api.chapa.co/v1"
+
+# Statuses worth retrying: rate limiting and transient gateway errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class ChapaClient:
+    """
+    Thin Chapa API client built on one keep-alive requests.Session.
+
+    Connections are pooled per process, so repeated calls skip the TCP/TLS
+    handshake. Timeouts, retries and the pool size come from settings.
+    The secret key and base URL are read on every call rather than frozen
+    at import time.
+    """
+
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff_factor=None):
+        pool_size = pool_size or getattr(settings, "CHAPA_POOL_SIZE", 2)
+        self.timeout = (
+            connect_timeout or getattr(settings, "CHAPA_CONNECT_TIMEOUT", 3.05),
+            read_timeout or getattr(settings, "CHAPA_READ_TIMEOUT", 10),
+        )
+        if max_retries is None:
+            max_retries = getattr(settings, "CHAPA_MAX_RETRIES", 2)
+        if backoff_factor is None:
+            backoff_factor = getattr(settings, "CHAPA_RETRY_BACKOFF", 0.3)
+
+        # Connection errors are retried for every method (nothing reached Chapa);
+        # read errors and 5xx responses only for idempotent GETs
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def base_url(self):
+        return getattr(settings, "CHAPA_BASE_URL", DEFAULT_BASE_URL)
+
+    def request(self, method, path, **kwargs):
+        headers = {"Authorization": f"Bearer {getattr(settings, 'CHAPA_SECRET_KEY', '') or ''}"}
+        headers.update(kwargs.pop("headers", {}))
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        try:
+            return self.session.request(method, f"{self.base_url}{path}", headers=headers, **kwargs)
+        finally:
+            # Shows up as chapa;dur=... in the request's Server-Timing header
+            metrics.record_outbound("chapa", time.perf_counter() - started)
 
-CHAPA_SECRET_KEY = os.getenv("CHAPA_SECRET_KEY", getattr(settings, "CHAPA_SECRET_KEY", ""))
-CHAPA_BASE_URL = os.getenv("CHAPA_BASE_URL", getattr(settings, "CHAPA_BASE_URL", "https://api.chapa.co/v1"))
+    def initialize(self, payload):
+        return self.request("POST", "/transaction/initialize", json=payload)
 
-HEADERS = {
-    "Authorization": f"Bearer {CHAPA_SECRET_KEY}",
-    "Content-Type": "application/json"
-}
+    def verify(self, tx_ref):
+        return self.request("GET", f"/transaction/verify/{tx_ref}")
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the per-process ChapaClient, creating it on first use
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ChapaClient()
+    return _client
+
+
+def reset_client():
+    """
+    Drop the per-process client; the next get_client() builds a fresh pool
+    """
+    global _client
+    _client = None
+
+
+# A forked worker must not reuse sockets opened by its parent
+os.register_at_fork(after_in_child=reset_client)
+
+
+def _json_or_error(call):
+    try:
+        return call().json()
+    except requests.exceptions.JSONDecodeError:
+        return {"status": "error", "message": "Invalid response from Chapa"}
+    except requests.Timeout:
+        return {"status": "error", "message": "Request timed out"}
+    except requests.RequestException as e:
+        return {"status": "error", "message": str(e)}
 
 
 def initialize_payment(amount, email, tx_ref, currency="TZS", first_name="", last_name="", callback_url=None):
@@ -29,33 +140,54 @@ def initialize_payment(amount, email, tx_ref, currency="TZS", first_name="", las
         "last_name": last_name,
         "callback_url": callback_url
     }
-
-    try:
-        response = requests.post(
-            f"{CHAPA_BASE_URL}/transaction/initialize",
-            headers=HEADERS,
-            json=payload,
-            timeout=10
-        )
-        return response.json()
-    except requests.Timeout:
-        return {"status": "error", "message": "Request timed out"}
-    except requests.RequestException as e:
-        return {"status": "error", "message": str(e)}
+    return _json_or_error(lambda: get_client().initialize(payload))
 
 
-def verify_payment(tx_ref):
+def verify_payment(tx_ref, client=None):
     """
     Verify the status of a Chapa payment
     """
-    try:
-        response = requests.get(
-            f"{CHAPA_BASE_URL}/transaction/verify/{tx_ref}",
-            headers=HEADERS,
-            timeout=10
-        )
-        return response.json()
-    except requests.Timeout:
-        return {"status": "error", "message": "Request timed out"}
-    except requests.RequestException as e:
-        return {"status": "error", "message": str(e)}
+    client = client or get_client()
+    return _json_or_error(lambda: client.verify(tx_ref))
+
+
+class RateLimiter:
+    """
+    Thread-safe pacer that spaces calls at most `rate` per second.
+
+    acquire() reserves the next free slot and sleeps until it arrives, so
+    any number of worker threads sharing one limiter stay under the ceiling.
+    A rate of 0 or None disables limiting.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def sign_webhook(body, secret=None):
+    """
+    HMAC-SHA256 hex digest Chapa sends with a webhook body
+    """
+    secret = secret if secret is not None else getattr(settings, "CHAPA_WEBHOOK_SECRET", "")
+    return hmac.new((secret or "").encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_webhook_signature(body, signature):
+    """
+    Check a webhook signature in constant time; always False when no secret is configured
+    """
+    if not signature or not getattr(settings, "CHAPA_WEBHOOK_SECRET", ""):
+        return False
+    return hmac.compare_digest(sign_webhook(body), signature)
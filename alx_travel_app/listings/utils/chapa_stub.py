@@ -0,0 +1,99 @@
+# listings/utils/chapa_stub.py
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _ChapaStubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive between calls
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY a
+    # kept-alive connection stalls on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.server.record()
+        if self.path.endswith("/transaction/initialize"):
+            tx_ref = body.get("tx_ref", "")
+            self._send_json(200, {
+                "status": "success",
+                "message": "Hosted Link",
+                "data": {"tx_ref": tx_ref, "checkout_url": f"https://checkout.chapa.test/{tx_ref}"},
+            })
+        else:
+            self._send_json(404, {"status": "failed", "message": "Not found"})
+
+    def do_GET(self):
+        self.server.record()
+        match = re.search(r"/transaction/verify/(?P<tx_ref>[^/?]+)", self.path)
+        if not match:
+            self._send_json(404, {"status": "failed", "message": "Not found"})
+            return
+        tx_ref = match.group("tx_ref")
+        outcome = self.server.outcomes.get(tx_ref, self.server.default_outcome)
+        self._send_json(200, {
+            "status": "success",
+            "message": "Payment details",
+            "data": {"tx_ref": tx_ref, "status": outcome},
+        })
+
+
+class ChapaStubServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Chapa API used by tests and benchmarks.
+
+    Answers /transaction/initialize and /transaction/verify/<tx_ref> with
+    Chapa-shaped JSON. Verify outcomes default to `default_outcome` and can
+    be set per tx_ref through `outcomes`. `latency` adds a fixed delay to
+    every call to imitate the real gateway.
+
+        with ChapaStubServer() as stub:
+            with override_settings(CHAPA_BASE_URL=stub.base_url):
+                ...
+    """
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, default_outcome="success", outcomes=None):
+        super().__init__(("127.0.0.1", 0), _ChapaStubHandler)
+        self.latency = latency
+        self.default_outcome = default_outcome
+        self.outcomes = dict(outcomes or {})
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record(self):
+        with self._calls_lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,39 @@
+# listings/utils/redis.py
+
+import os
+import threading
+
+import redis
+from django.conf import settings
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Return the per-process Redis client for REDIS_URL, or None when the
+    project is not configured with Redis (callers fall back to in-process state)
+    """
+    global _client
+    url = getattr(settings, "REDIS_URL", "")
+    if not url.startswith(("redis://", "rediss://")):
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Short timeouts: Redis is used for side data, never worth stalling a request on
+                _client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _client
+
+
+def reset_redis():
+    """
+    Drop the per-process client; the next get_redis() opens a fresh pool
+    """
+    global _client
+    _client = None
+
+
+# A forked worker must not reuse sockets opened by its parent
+os.register_at_fork(after_in_child=reset_redis)
@@ -1,25 +1,67 @@
+import hmac
 import time
 import json
 import logging
 import requests
 import random
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.decorators import api_view, action
 from rest_framework.views import APIView
+from rest_framework.generics import ListAPIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-
-from .models import Listing, Booking, Payment
-from .serializers import ListingSerializer, BookingSerializer, PaymentSerializer, PaymentInputSerializer
-from .tasks import send_payment_confirmation_email
-from alx_travel_app.listings.utils.chapa import initialize_payment, verify_payment
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import (
+    Listing, Booking, Review, Payment, ChapaWebhookEvent, ListingMonthlyStats, BOOKING_OVERLAP_CONSTRAINT,
+)
+from .serializers import (
+    ListingSerializer,
+    AvailabilityQuerySerializer,
+    BookingSerializer,
+    BookingBulkCreateSerializer,
+    ReviewSerializer,
+    PaymentSerializer,
+    PaymentInputSerializer,
+    ExportQuerySerializer,
+    ListingMonthlyStatsSerializer,
+    ListingMonthlyStatsQuerySerializer,
+)
+from . import cache as listing_cache
+from . import metrics
+from . import schema
+from .exports import ExportContentNegotiation, filter_created, stream_export
+from .idempotency import idempotent
+from .mixins import ConditionalGetMixin, ListingCacheMixin
+from .pagination import (
+    ListingCursorPagination,
+    BookingCursorPagination,
+    ReviewCursorPagination,
+    PaymentCursorPagination,
+    MonthlyStatsCursorPagination,
+)
+from .tasks import send_payment_confirmation_email, record_payment_confirmations
+from alx_travel_app.listings.utils.chapa import get_client, verify_webhook_signature
 
 logger = logging.getLogger(__name__)
 
+# Documented on the payment endpoints wrapped with @idempotent
+IDEMPOTENCY_KEY_PARAM = openapi.Parameter(
+    "Idempotency-Key",
+    openapi.IN_HEADER,
+    type=openapi.TYPE_STRING,
+    required=False,
+    description="Retries with the same key return the first response instead of paying twice",
+)
+
 # -------------------------
 # Test Email
 # -------------------------
@@ -66,18 +108,8 @@ class TestChapaPaymentView(APIView):
             "callback_url": "https://webhook.site/example"
         }
 
-        headers = {
-            "Authorization": f"Bearer {settings.CHAPA_SECRET_KEY}",
-            "Content-Type": "application/json"
-        }
-
         try:
-            response = requests.post(
-                "https://api.chapa.co/v1/transaction/initialize",
-                json=payload,
-                headers=headers,
-                timeout=10
-            )
+            response = get_client().initialize(payload)
             return Response(response.json(), status=response.status_code)
         except requests.exceptions.RequestException as e:
             logger.error(f"Chapa test payment failed: {str(e)}")
@@ -87,61 +119,192 @@ class TestChapaPaymentView(APIView):
 # -------------------------
 # Listing ViewSet
 # -------------------------
-class ListingViewSet(ModelViewSet):
+class ListingViewSet(ConditionalGetMixin, ListingCacheMixin, ModelViewSet):
     queryset = Listing.objects.all()
     serializer_class = ListingSerializer
+    pagination_class = ListingCursorPagination
+
+    def get_keyset_ordering(self):
+        # ?ordering=rating sorts by the denormalized average, best first
+        if self.request.query_params.get("ordering") == "rating":
+            return ("-average_rating", "-id")
+        return None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, "swagger_fake_view", False) or self.action != "list":
+            return queryset
+
+        if self.get_keyset_ordering():
+            queryset = queryset.with_average_rating()
+
+        # Availability search: /api/listings/?check_in=YYYY-MM-DD&check_out=YYYY-MM-DD
+        params = self.request.query_params
+        if "check_in" in params or "check_out" in params:
+            search = AvailabilityQuerySerializer(data=params)
+            search.is_valid(raise_exception=True)
+            queryset = queryset.available_between(
+                search.validated_data["check_in"], search.validated_data["check_out"]
+            )
+        return queryset
+
+    @swagger_auto_schema(
+        operation_description="List listings. Pass check_in and check_out to return only "
+                              "listings with no overlapping booking in that range, and "
+                              "ordering=rating to sort by average rating.",
+        manual_parameters=[
+            openapi.Parameter("check_in", openapi.IN_QUERY, type=openapi.TYPE_STRING, format="date"),
+            openapi.Parameter("check_out", openapi.IN_QUERY, type=openapi.TYPE_STRING, format="date"),
+            openapi.Parameter("ordering", openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=["rating"]),
+        ],
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=["get"], url_path="cache-stats", permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        return Response(listing_cache.stats())
+
 
 # -------------------------
 # Booking ViewSet
 # -------------------------
-class BookingViewSet(ModelViewSet):
+class BookingConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The listing is already booked for some of these dates."
+    default_code = "booking_conflict"
+
+
+def save_without_overlap(save):
+    """
+    Run save() and turn a violation of the database overlap constraint
+    into a 409. The savepoint keeps an outer transaction usable.
+    """
+    try:
+        with transaction.atomic():
+            return save()
+    except IntegrityError as e:
+        if BOOKING_OVERLAP_CONSTRAINT in str(e):
+            raise BookingConflict() from e
+        raise
+
+
+class BookingViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = BookingCursorPagination
+    # property_title is part of the body, so a listing rename must change the ETag;
+    # user_email changes bump updated_at (signals.touch_user_bookings)
+    last_modified_fields = ("updated_at", "property__updated_at")
 
     def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
             # Return first 5 bookings for Swagger display
             return Booking.objects.all()[:5]
-        # Return all bookings
-        return Booking.objects.all()
+        # Return all bookings, joining the rows BookingSerializer reads (user.email, property.title)
+        return Booking.objects.select_related("user", "property")
+
+    def perform_create(self, serializer):
+        self._check_overlap(serializer)
+        save_without_overlap(serializer.save)
+
+    def perform_update(self, serializer):
+        self._check_overlap(serializer)
+        save_without_overlap(serializer.save)
+
+    @staticmethod
+    def _check_overlap(serializer):
+        # Fast, friendly answer for the common case. Two requests racing past
+        # this check are stopped by the exclusion constraint instead (no row locks).
+        data, instance = serializer.validated_data, serializer.instance
+        listing = data.get("property", getattr(instance, "property", None))
+        check_in = data.get("check_in", getattr(instance, "check_in", None))
+        check_out = data.get("check_out", getattr(instance, "check_out", None))
+        clashes = Booking.objects.overlapping(check_in, check_out).filter(property=listing)
+        if instance is not None:
+            clashes = clashes.exclude(pk=instance.pk)
+        if clashes.exists():
+            raise BookingConflict()
+
+
+    @swagger_auto_schema(
+        method="post",
+        operation_description="Create many bookings at once. Accepts a JSON array of bookings "
+                              "(or {\"bookings\": [...]}); every row is validated before any is saved.",
+        request_body=BookingBulkCreateSerializer,
+    )
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        if getattr(self, "swagger_fake_view", False):
+            return Response({"message": "Swagger schema"}, status=200)
 
+        data = {"bookings": request.data} if isinstance(request.data, list) else request.data
+        serializer = BookingBulkCreateSerializer(data=data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        # A booking committed after validation can still clash; the constraint reports it as a 409
+        bookings = save_without_overlap(serializer.save)
+        return Response(
+            {"created": len(bookings), "ids": [booking.id for booking in bookings]},
+            status=status.HTTP_201_CREATED,
+        )
 
     @swagger_auto_schema(
         method="post",
         operation_description="Pay for a booking",
+        manual_parameters=[IDEMPOTENCY_KEY_PARAM],
         responses={201: PaymentSerializer},
     )
     @action(detail=True, methods=["post"], url_path="pay")
+    @idempotent
     def pay(self, request, pk=None):
         if getattr(self, "swagger_fake_view", False):
             return Response({"message": "Swagger schema"}, status=200)
 
         booking = get_object_or_404(Booking, id=pk, user=request.user)
 
-        if Payment.objects.filter(
-            booking_reference__startswith=f"booking_{booking.id}_", user=request.user
-        ).exists():
+        if Payment.objects.filter(booking=booking, payment_status__in=Payment.ACTIVE_STATUSES).exists():
             return Response(
                 {"error": "Payment already exists"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
         booking_ref = f"booking_{booking.id}_{int(time.time())}"
-        payment = Payment.objects.create(
-            user=request.user,
-            booking_reference=booking_ref,
-            amount=random.randint(1000, 5000),
-            transaction_id=f"tx_{random.randint(1000,9999)}",
-            payment_status=random.choice(["Pending", "Completed", "Failed"]),
-        )
-
-        try:
-            send_payment_confirmation_email.delay(booking.id)
-        except Exception as e:
-            logger.error(f"Email task failed: {str(e)}")
+        with transaction.atomic():
+            payment = Payment.objects.create(
+                user=request.user,
+                booking=booking,
+                booking_reference=booking_ref,
+                amount=random.randint(1000, 5000),
+                transaction_id=f"tx_{random.randint(1000,9999)}",
+                payment_status=random.choice(["Pending", "Completed", "Failed"]),
+            )
+            # Published by the dispatch_outbox task; no broker call on the request path
+            record_payment_confirmations(booking.id)
 
         return Response(PaymentSerializer(payment).data, status=status.HTTP_201_CREATED)
 
+# -------------------------
+# Review ViewSet
+# -------------------------
+class ReviewViewSet(ModelViewSet):
+    serializer_class = ReviewSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ReviewCursorPagination
+
+    def get_queryset(self):
+        # ReviewSerializer reads user.email and property.title
+        queryset = Review.objects.select_related("user", "property")
+        if getattr(self, "swagger_fake_view", False):
+            return queryset
+
+        # /api/reviews/?property=<listing id>
+        property_id = self.request.query_params.get("property")
+        if property_id is not None:
+            if not property_id.isdigit():
+                raise ValidationError({"property": ["A valid listing id is required."]})
+            queryset = queryset.filter(property_id=int(property_id))
+        return queryset
+
 # -------------------------
 # Initiate Payment
 # -------------------------
@@ -150,13 +313,16 @@ class InitiatePaymentView(APIView):
 
     @swagger_auto_schema(
         request_body=PaymentInputSerializer,
+        manual_parameters=[IDEMPOTENCY_KEY_PARAM],
         responses={201: PaymentSerializer}
     )
+    @idempotent
     def post(self, request, booking_id):
         if getattr(self, "swagger_fake_view", False):
             return Response({"message": "Swagger schema"}, status=200)
 
-        booking = get_object_or_404(Booking, id=booking_id, user=request.user)
+        # property.price_per_night is needed for the default amount
+        booking = get_object_or_404(Booking.objects.select_related("property"), id=booking_id, user=request.user)
 
         serializer = PaymentInputSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -167,7 +333,7 @@ class InitiatePaymentView(APIView):
         )
         currency = serializer.validated_data.get("currency", "ETB")
 
-        if Payment.objects.filter(booking_reference=f"booking_{booking.id}", user=request.user).exists():
+        if Payment.objects.filter(booking=booking, payment_status__in=Payment.ACTIVE_STATUSES).exists():
             return Response({"error": "Payment already exists"}, status=status.HTTP_400_BAD_REQUEST)
 
         booking_ref = f"booking_{booking.id}_{int(time.time())}"
@@ -179,24 +345,15 @@ class InitiatePaymentView(APIView):
             "callback_url": f"{settings.BASE_URL}/api/payments/verify/{booking.id}/",
         }
 
-        headers = {
-            "Authorization": f"Bearer {settings.CHAPA_SECRET_KEY}",
-            "Content-Type": "application/json"
-        }
-
         try:
-            response = requests.post(
-                "https://api.chapa.co/v1/transaction/initialize",
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=10
-            )
+            response = get_client().initialize(payload)
             response_data = response.json()
             logger.info(f"Chapa init response: {response_data}")
 
             if response.status_code == 200 and response_data.get("status") == "success":
                 payment = Payment.objects.create(
                     user=request.user,
+                    booking=booking,
                     booking_reference=booking_ref,
                     amount=amount,
                     transaction_id=response_data["data"]["tx_ref"],
@@ -224,53 +381,236 @@ class VerifyPaymentView(APIView):
         if getattr(self, "swagger_fake_view", False):
             return Response({"message": "Swagger schema"}, status=200)
 
-        payment = Payment.objects.filter(
-            user=request.user,
-            booking_reference__contains=f"_{booking_id}_"
-        ).first()
+        payment = (
+            Payment.objects.select_related("user")
+            .filter(user=request.user, booking_id=booking_id)
+            .order_by("-created_at")
+            .first()
+        )
 
         if not payment:
             return Response({"error": "Payment not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        try:
-            response = requests.get(
-                f"https://api.chapa.co/v1/transaction/verify/{payment.transaction_id}",
-                headers={"Authorization": f"Bearer {settings.CHAPA_SECRET_KEY}"},
-                timeout=10
-            )
-            response_data = response.json()
-            logger.info(f"Chapa verify response: {response_data}")
-
-            if response.status_code == 200 and response_data.get("status") == "success":
-                payment.payment_status = "Completed"
-                payment.save()
-
-                try:
-                    send_payment_confirmation_email.delay(booking_id)
-                except Exception as e:
-                    logger.error(f"Failed to enqueue email task: {str(e)}")
+        # Status is kept current by the Chapa webhook, so this is a local read only
+        http_status = status.HTTP_400_BAD_REQUEST if payment.payment_status == "Failed" else status.HTTP_200_OK
+        return Response(
+            {"status": payment.payment_status.lower(), "payment": PaymentSerializer(payment).data},
+            status=http_status,
+        )
 
-                return Response({"status": "completed", "payment": PaymentSerializer(payment).data})
 
-            payment.payment_status = "Failed"
-            payment.save()
-            return Response({"status": "failed", "payment": PaymentSerializer(payment).data}, status=status.HTTP_400_BAD_REQUEST)
+# -------------------------
+# Chapa Webhook
+# -------------------------
+class ChapaWebhookView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    swagger_schema = None
+
+    # Chapa transaction status -> Payment.payment_status
+    STATUS_MAP = {
+        "success": "Completed",
+        "failed": "Failed",
+        "cancelled": "Failed",
+    }
+
+    def post(self, request):
+        body = request.body
+        signature = request.headers.get("x-chapa-signature") or request.headers.get("Chapa-Signature")
+        if not verify_webhook_signature(body, signature):
+            logger.warning("Rejected Chapa webhook with missing or invalid signature")
+            return Response({"error": "Invalid signature"}, status=status.HTTP_403_FORBIDDEN)
 
-        except Exception as e:
-            logger.error(f"Unexpected error during payment verification: {str(e)}")
-            return Response({"error": "Payment verification failed"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return Response({"error": "Invalid payload"}, status=status.HTTP_400_BAD_REQUEST)
+
+        tx_ref = str(data.get("tx_ref") or "")
+        chapa_status = str(data.get("status") or "").lower()
+        new_status = self.STATUS_MAP.get(chapa_status)
+        event = dict(event=str(data.get("event") or "")[:50], tx_ref=tx_ref[:100], status=chapa_status[:20])
+
+        with transaction.atomic():
+            payment = Payment.objects.select_for_update().filter(transaction_id=tx_ref).first() if tx_ref else None
+            # Chapa retries until it gets a 200; a redelivered event is acknowledged
+            # but not stored again (the payment row lock serializes duplicates)
+            if tx_ref and ChapaWebhookEvent.objects.filter(**event).exists():
+                logger.info(f"Duplicate Chapa webhook {event} ignored")
+                return Response({"status": "received"}, status=status.HTTP_200_OK)
+            ChapaWebhookEvent.objects.create(**event, payload=data, payment=payment)
+
+            # Completed is final; repeated or late callbacks never downgrade it
+            if payment and new_status and payment.payment_status not in ("Completed", new_status):
+                payment.payment_status = new_status
+                payment.save(update_fields=["payment_status"])
+
+                if new_status == "Completed" and payment.booking_id:
+                    record_payment_confirmations(payment.booking_id)
+
+        if payment is None:
+            logger.warning(f"Chapa webhook for unknown tx_ref {tx_ref!r}")
+        return Response({"status": "received"}, status=status.HTTP_200_OK)
 
 
 # -------------------------
 # Verified Payments List
 # -------------------------
-class VerifiedPaymentsView(APIView):
+class VerifiedPaymentsView(ListAPIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = PaymentSerializer
+    pagination_class = PaymentCursorPagination
+
+    def get_queryset(self):
+        # PaymentSerializer reads user.email for every row
+        return Payment.objects.filter(payment_status="Completed").select_related("user")
 
+
+# -------------------------
+# Streaming exports (CSV / NDJSON)
+# -------------------------
+class ExportView(APIView):
+    """
+    Streams every matching row, oldest first, instead of building a page of
+    serialized objects: memory stays flat however many rows are exported.
+    """
+    permission_classes = [IsAdminUser]
+    content_negotiation_class = ExportContentNegotiation
+    queryset = None
+    # Output column -> values_list lookup; mirrors the API serializer's fields
+    columns = {}
+    filename = "export"
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter("since", openapi.IN_QUERY, type=openapi.TYPE_STRING, format="date",
+                              description="First creation date to include"),
+            openapi.Parameter("until", openapi.IN_QUERY, type=openapi.TYPE_STRING, format="date",
+                              description="Last creation date to include"),
+            openapi.Parameter("output", openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=["csv", "ndjson"]),
+        ],
+        responses={200: "CSV or NDJSON stream"},
+    )
     def get(self, request):
+        params = ExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = filter_created(
+            self.queryset.all(), params.validated_data.get("since"), params.validated_data.get("until")
+        )
+        # Walks the (created_at, id) index in order
+        queryset = queryset.order_by("created_at", "id")
+        return stream_export(queryset, self.columns, params.validated_data["output"], self.filename)
+
+
+class PaymentExportView(ExportView):
+    queryset = Payment.objects.filter(payment_status="Completed")
+    columns = {
+        "id": "id",
+        "user": "user_id",
+        "user_email": "user__email",
+        "booking": "booking_id",
+        "booking_reference": "booking_reference",
+        "amount": "amount",
+        "transaction_id": "transaction_id",
+        "payment_status": "payment_status",
+        "created_at": "created_at",
+    }
+    filename = "payments"
+
+
+class BookingExportView(ExportView):
+    queryset = Booking.objects.all()
+    columns = {
+        "id": "id",
+        "user": "user_id",
+        "user_email": "user__email",
+        "property": "property_id",
+        "property_title": "property__title",
+        "check_in": "check_in",
+        "check_out": "check_out",
+        "created_at": "created_at",
+    }
+    filename = "bookings"
+
+
+# -------------------------
+# Monthly occupancy and revenue analytics
+# -------------------------
+class ListingMonthlyStatsView(ListAPIView):
+    """
+    Reads the ListingMonthlyStats rollup, which writes keep current, so a
+    dashboard fetches one row per listing and month instead of aggregating
+    bookings and payments on every request.
+    """
+    permission_classes = [IsAdminUser]
+    serializer_class = ListingMonthlyStatsSerializer
+    pagination_class = MonthlyStatsCursorPagination
+
+    def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
-            return Response({"message": "Swagger schema"}, status=200)
+            return ListingMonthlyStats.objects.none()
+        params = ListingMonthlyStatsQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+        queryset = ListingMonthlyStats.objects.all()
+        if "property" in filters:
+            queryset = queryset.filter(property_id=filters["property"])
+        if "since" in filters:
+            queryset = queryset.filter(month__gte=filters["since"])
+        if "until" in filters:
+            queryset = queryset.filter(month__lte=filters["until"])
+        return queryset
 
-        payments = Payment.objects.filter(payment_status="Completed")
-        serializer = PaymentSerializer(payments, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter("property", openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="Only this listing"),
+            openapi.Parameter("since", openapi.IN_QUERY, type=openapi.TYPE_STRING, format="date",
+                              description="First month to include (any day of it)"),
+            openapi.Parameter("until", openapi.IN_QUERY, type=openapi.TYPE_STRING, format="date",
+                              description="Last month to include (any day of it)"),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+# -------------------------
+# Prometheus metrics
+# -------------------------
+def metrics_view(request):
+    # Plain Django view: scrapers send a static bearer token, not a user JWT
+    expected = settings.METRICS_TOKEN
+    if expected:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.encode(), expected.encode()):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        # Routes, timings and error rates are not for the public: off unless a token is configured
+        logger.warning("/metrics requested but METRICS_TOKEN is not set; refusing outside DEBUG")
+        return HttpResponse(status=403)
+    return HttpResponse(
+        metrics.render(metrics.registry.snapshot()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+# -------------------------
+# Precomputed OpenAPI schema
+# -------------------------
+def openapi_schema_view(request):
+    # Serves the file written by `manage.py generate_openapi`; Swagger UI loads it via SPEC_URL
+    body, etag = schema.artifact.load()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+    return response
+
+
+def swagger_ui_view(request, *args, **kwargs):
+    # Swagger UI fetches the spec from openapi_schema_view (SWAGGER_SETTINGS["SPEC_URL"])
+    return schema.swagger_ui()(request, *args, **kwargs)
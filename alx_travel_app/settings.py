@@ -12,6 +12,8 @@ environ.Env.read_env(os.path.join(BASE_DIR, ".env"))
 
 SECRET_KEY = env("SECRET_KEY", default="django-insecure-xyz123")
 CHAPA_SECRET_KEY = os.getenv("CHAPA_SECRET_KEY")
+CHAPA_BASE_URL = os.getenv("CHAPA_BASE_URL", "https://api.chapa.co/v1")
+CHAPA_WEBHOOK_SECRET = os.getenv("CHAPA_WEBHOOK_SECRET")
 BASE_URL = os.getenv("BASE_URL", "http://127.0.0.1:8000")
 
 DEBUG = env.bool("DEBUG", default=False)
@@ -49,6 +51,7 @@ INSTALLED_APPS = [
 # Middleware
 # -----------------------
 MIDDLEWARE = [
+    "alx_travel_app.listings.middleware.RequestMetricsMiddleware",  # first, so it times the whole stack
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # serve static files in prod
@@ -124,8 +127,9 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 # -----------------------
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
+        # Bearer requests stop at the first class and never touch the session
+        "alx_travel_app.listings.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -158,6 +162,14 @@ EMAIL_HOST_USER = env("EMAIL_HOST_USER").strip()
 EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD").strip()
 DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL").strip()
 
+# Batch mode: confirmations are buffered in Redis and sent over one SMTP connection
+# per batch (flushed every EMAIL_BATCH_WINDOW seconds by beat, see celery.py)
+EMAIL_BATCH_ENABLED = env.bool("EMAIL_BATCH_ENABLED", default=False)
+EMAIL_BATCH_SIZE = env.int("EMAIL_BATCH_SIZE", default=50)                # messages that trigger an early flush
+EMAIL_BATCH_WINDOW = env.float("EMAIL_BATCH_WINDOW", default=10)          # seconds between scheduled flushes
+EMAIL_BATCH_PROCESSING_TIMEOUT = env.int("EMAIL_BATCH_PROCESSING_TIMEOUT", default=300)  # seconds before a batch claimed by a dead flush is queued again
+EMAIL_BATCH_MAX_ATTEMPTS = env.int("EMAIL_BATCH_MAX_ATTEMPTS", default=3)
+
 # -----------------------
 # Celery
 # -----------------------
@@ -167,11 +179,79 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "Africa/Nairobi"
+# Queues, routes and rate limits live in celery.py
+OUTBOX_BATCH_SIZE = env.int("OUTBOX_BATCH_SIZE", default=100)   # outbox rows claimed per dispatcher batch
+OUTBOX_LEASE_TIMEOUT = env.int("OUTBOX_LEASE_TIMEOUT", default=60)   # seconds a claimed row is left to its dispatcher
+OUTBOX_DISPATCH_INTERVAL = env.float("OUTBOX_DISPATCH_INTERVAL", default=60)   # seconds between beat sweeps of the outbox
+OUTBOX_MAX_ATTEMPTS = env.int("OUTBOX_MAX_ATTEMPTS", default=10)   # failures (other than broker errors) before a row is parked
+TASK_DEDUP_TTL = env.int("TASK_DEDUP_TTL", default=3600)   # seconds a (event, booking) notification stays deduplicated
+
+# -----------------------
+# Cache (shares the Redis instance used by Celery)
+# -----------------------
+REDIS_URL = env("REDIS_URL", default=CELERY_BROKER_URL)
+
+if REDIS_URL.startswith(("redis://", "rediss://")):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "travel",
+        }
+    }
+else:
+    # Broker is not Redis (e.g. RabbitMQ): fall back to a per-process cache
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+LISTING_CACHE_TIMEOUT = env.int("LISTING_CACHE_TIMEOUT", default=300)      # seconds
+LISTING_CACHE_LOCK_TIMEOUT = env.int("LISTING_CACHE_LOCK_TIMEOUT", default=10)
+LISTING_CACHE_LOCK_WAIT = env.float("LISTING_CACHE_LOCK_WAIT", default=2)  # how long a miss waits for another rebuild
+AUTH_USER_CACHE_TIMEOUT = env.int("AUTH_USER_CACHE_TIMEOUT", default=300)  # seconds a JWT user stays in the shared cache
+AUTH_USER_LOCAL_CACHE_TIMEOUT = env.float("AUTH_USER_LOCAL_CACHE_TIMEOUT", default=5)  # per-process copy; 0 disables it
+
+# -----------------------
+# Bookings
+# -----------------------
+BOOKING_BULK_MAX_ROWS = env.int("BOOKING_BULK_MAX_ROWS", default=500)   # rows per POST /api/bookings/bulk/
+IDEMPOTENCY_KEY_TTL = env.int("IDEMPOTENCY_KEY_TTL", default=86400)      # seconds a payment response is replayable
+IDEMPOTENCY_PENDING_TIMEOUT = env.int("IDEMPOTENCY_PENDING_TIMEOUT", default=300)  # seconds before an unfinished key may be retried
+EXPORT_CHUNK_SIZE = env.int("EXPORT_CHUNK_SIZE", default=2000)           # rows fetched per round trip by CSV/NDJSON exports
+
+# -----------------------
+# Chapa HTTP client
+# -----------------------
+# One keep-alive pool per process, sized to the gunicorn thread count
+CHAPA_POOL_SIZE = env.int("CHAPA_POOL_SIZE", default=env.int("GUNICORN_THREADS", default=2))
+CHAPA_CONNECT_TIMEOUT = env.float("CHAPA_CONNECT_TIMEOUT", default=3.05)
+CHAPA_READ_TIMEOUT = env.float("CHAPA_READ_TIMEOUT", default=10)
+CHAPA_MAX_RETRIES = env.int("CHAPA_MAX_RETRIES", default=2)
+CHAPA_RETRY_BACKOFF = env.float("CHAPA_RETRY_BACKOFF", default=0.3)
+
+# Periodic reconciliation of Pending payments (schedule lives in celery.py)
+CHAPA_RECONCILE_CHUNK_SIZE = env.int("CHAPA_RECONCILE_CHUNK_SIZE", default=200)
+CHAPA_RECONCILE_CONCURRENCY = env.int("CHAPA_RECONCILE_CONCURRENCY", default=4)
+CHAPA_RECONCILE_MAX_RPS = env.float("CHAPA_RECONCILE_MAX_RPS", default=10)
+CHAPA_RECONCILE_MIN_AGE = env.int("CHAPA_RECONCILE_MIN_AGE", default=300)     # leave fresh payments to the webhook
+
+# -----------------------
+# Request metrics (/metrics, Server-Timing)
+# -----------------------
+METRICS_TOKEN = env("METRICS_TOKEN", default="")                        # bearer token for /metrics; unset = DEBUG only
+METRICS_FLUSH_INTERVAL = env.float("METRICS_FLUSH_INTERVAL", default=5)  # seconds between per-process pushes to Redis
+SERVER_TIMING_ENABLED = env.bool("SERVER_TIMING_ENABLED", default=True)
+
+# -----------------------
+# Admin
+# -----------------------
+ADMIN_EXACT_COUNT_LIMIT = env.int("ADMIN_EXACT_COUNT_LIMIT", default=10000)  # changelists estimate counts above this
 
 # -----------------------
 # Swagger / drf-yasg
 # -----------------------
 SWAGGER_SETTINGS = {
+    "DEFAULT_INFO": "alx_travel_app.listings.schema.API_INFO",
+    # Swagger UI loads the precomputed spec instead of ?format=openapi, which introspects every view
+    "SPEC_URL": "openapi-schema",
     "USE_SESSION_AUTH": False,
     "SECURITY_DEFINITIONS": {
         "Bearer": {
@@ -183,6 +263,9 @@ SWAGGER_SETTINGS = {
     },
 }
 
+OPENAPI_SCHEMA_FILE = env("OPENAPI_SCHEMA_FILE", default=str(BASE_DIR / "alx_travel_app" / "openapi.json"))
+OPENAPI_SCHEMA_MAX_AGE = env.int("OPENAPI_SCHEMA_MAX_AGE", default=300)  # seconds clients may reuse /openapi.json
+
 # -----------------------
 # Default primary key
 # -----------------------
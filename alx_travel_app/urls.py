@@ -1,21 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include, re_path
-from rest_framework import permissions
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 from django.shortcuts import redirect
 from django.views.generic import RedirectView
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Travel App API",
-        default_version="v1",
-        description="API documentation for the travel app",
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
+from alx_travel_app.listings.views import metrics_view, openapi_schema_view, swagger_ui_view
 
 urlpatterns = [
     path("favicon.ico", RedirectView.as_view(url="/static/images/favicon.ico")),
@@ -24,12 +12,13 @@ urlpatterns = [
     path("api/", include("alx_travel_app.listings.urls")),
     path("accounts/", include("django.contrib.auth.urls")),
 
-    # Swagger UI
-    re_path(
-        r"^swagger/$",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
+    # Swagger UI; drf-yasg's view is built on the first request, not at startup
+    re_path(r"^swagger/$", swagger_ui_view, name="schema-swagger-ui"),
+    # Precomputed spec (manage.py generate_openapi), served with ETag and Cache-Control
+    path("openapi.json", openapi_schema_view, name="openapi-schema"),
+
+    # Prometheus scrape target (request timings from RequestMetricsMiddleware)
+    path("metrics", metrics_view, name="metrics"),
 
     # JWT endpoints
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
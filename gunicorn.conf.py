@@ -1,6 +1,45 @@
 # gunicorn.conf.py
+import gc
+import os
+
 bind = "0.0.0.0:10000"
 workers = 2
-threads = 2
+threads = int(os.getenv("GUNICORN_THREADS", 2))  # also sizes the Chapa connection pool
 timeout = 120
 worker_class = "gthread"
+
+# Import Django once in the master and fork workers from it: they start
+# instantly and share the imported code pages copy-on-write. Code changes
+# then need a full restart (HUP reloads config only); set
+# GUNICORN_PRELOAD=false to import in each worker instead.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # Warm the URLconf (every view and serializer) before forking, then close
+    # anything opened while importing so no socket is shared with the workers
+    from django.db import connections
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    connections.close_all()
+    # Keep the imported objects out of the collector, so GC passes in the
+    # workers do not touch (and un-share) the master's pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    # Connections inherited from the master belong to its process: drop them
+    # so each worker opens its own. DB connections are normally already closed
+    # in when_ready; Redis and Chapa clients are rebuilt on first use.
+    from django.db import connections
+    from alx_travel_app.listings.utils.chapa import reset_client
+    from alx_travel_app.listings.utils.redis import reset_redis
+
+    connections.close_all()
+    reset_redis()
+    reset_client()